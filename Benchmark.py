@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:20:37 2026
+
+@author: Jack Cochrane
+
+Times where an acquisition spends its time. make_plot is run in every IM mode with both PHAS settings, and the
+control panel's refresh_figure_toolbar, set_sensitivity, and export_data are run the way the buttons run them.
+Each run is split into the phases timed in Imports - Setup.py (connect, configure, autorange, settle, calibrate,
+transfer, parse, frequency axis, plot), anything left over is 'other'.
+
+The results are printed and saved as JSON in SA_data so runs can be compared after a change.
+By default the SA Simulator is used, --hardware uses the analyzer on the bus instead
+
+python Benchmark.py [--hardware] [--resource GPIB::11] [--repeats 3] [--transfer ascii|binary|both] [--cold] [--no-panel] [--output file]
+"""
+
+import matplotlib
+matplotlib.use('Agg') #Plots are made and closed without ever being shown
+import matplotlib.pyplot as plt
+import numpy as np
+import time
+import sys
+import os
+import json
+import argparse
+import importlib.util
+from pathlib import Path
+from datetime import datetime, timezone
+
+#Loads Imports - Setup.py as the module sa_lib, the file name has spaces in it so it cant be imported normally
+if 'sa_lib' in sys.modules:
+    sa_lib = sys.modules['sa_lib']
+else:
+    lib_spec = importlib.util.spec_from_file_location('sa_lib', Path(__file__).with_name('Imports - Setup.py'))
+    sa_lib = importlib.util.module_from_spec(lib_spec)
+    sys.modules['sa_lib'] = sa_lib
+    lib_spec.loader.exec_module(sa_lib)
+
+PHASES = ['connect', 'configure', 'autorange', 'settle', 'calibrate', 'transfer', 'parse', 'frequency axis', 'plot', 'other']
+IM_MODES = ['bodefull', 'bodehalf', 'a', 'b', 'bothhalf', 'bothfull']
+
+#Times one call with the phases in sa_lib timed, returns the total and the time of each phase
+#Time that isnt in any phase is put in 'other'
+def time_call (function, *args, **kwargs):
+    timer = sa_lib.PhaseTimer()
+    sa_lib.phase_timer = timer
+    start = time.perf_counter()
+    try:
+        function(*args, **kwargs)
+    finally:
+        total = time.perf_counter() - start
+        sa_lib.phase_timer = None
+    phases = dict(timer.totals)
+    phases['other'] = max(total - sum(phases.values()), 0.0)
+    return {'total': total, 'phases': phases}
+
+#Averages the runs of one benchmark, times are in seconds
+def summarize (runs):
+    totals = np.array([x['total'] for x in runs])
+    phases = {}
+    for name in PHASES:
+        phases[name] = float(np.mean([x['phases'].get(name, 0.0) for x in runs]))
+    return {'runs': len(runs), 'mean': float(totals.mean()), 'min': float(totals.min()), 'max': float(totals.max()),
+            'captures_per_minute': 60 / float(totals.mean()), 'phases': phases}
+
+#Prints one line of the results table, the phases are in ms
+def print_row (name, summary):
+    phases = ''.join(f"{summary['phases'][x] * 1000:>10.1f}" for x in PHASES)
+    print(f"{name:<28}{summary['mean'] * 1000:>10.1f}{summary['captures_per_minute']:>10.1f}" + phases)
+
+#Prints the header of the results table
+def print_header ():
+    print(f"{'':<28}{'total ms':>10}{'per min':>10}" + ''.join(f"{x[:9]:>10}" for x in PHASES))
+
+#cold=True forgets the remembered sensitivities and binary calibrations before every run
+def clear_caches (cold):
+    if cold:
+        sa_lib.sensitivity_memory.clear()
+        sa_lib.binary_calibrations.clear()
+
+#Opens and closes a session repeats times
+def benchmark_connect (repeats = 3, resource_name = None, simulate = True, **options):
+    runs = []
+    for x in range(repeats):
+        session = sa_lib.SASession(resource_name, simulate=simulate, **options)
+        runs.append(time_call(session.open))
+        session.close()
+    summary = summarize(runs)
+    print_row('connect', summary)
+    return summary
+
+#Runs make_plot in every IM mode with both PHAS settings, for each transfer
+#A mode that raises is saved with its error instead of timings
+def benchmark_make_plot (session, repeats = 3, transfers = ('ascii',), cold = False, MD = 1, AD = 0, SP = 14):
+    results = []
+    for transfer in transfers:
+        for IM in IM_MODES:
+            for PHAS in (0, 1):
+                runs = []
+                try:
+                    for x in range(repeats):
+                        clear_caches(cold)
+                        runs.append(time_call(sa_lib.make_plot, MD, AD, SP, IM, PHAS=PHAS, transfer=transfer, session=session))
+                        plt.close('all')
+                except (ValueError, TimeoutError) as error: #A failed mode is recorded, the rest still run
+                    plt.close('all')
+                    print(f"{IM + ' PHAS' + str(PHAS) + ' ' + transfer:<28}failed: " + str(error))
+                    results.append({'IM': IM, 'PHAS': PHAS, 'transfer': transfer, 'error': str(error)})
+                    continue
+                summary = summarize(runs)
+                print_row(IM + ' PHAS' + str(PHAS) + ' ' + transfer, summary)
+                results.append({'IM': IM, 'PHAS': PHAS, 'transfer': transfer, **summary})
+    return results
+
+#Waits for a request the panel gave its worker and delivers its callback like poll_worker would
+#The empty request is done only after the worker has queued the callback of the request before it
+def finish_panel_request (panel, future):
+    marker = panel.worker.submit(lambda SA: None)
+    while not marker.done():
+        panel.root.update()
+        time.sleep(0.001)
+    future.result()
+    panel.worker.deliver()
+    panel.root.update()
+
+#Loads the control panel without starting its main loop and times its refresh, sensitivity, and export paths
+#The panel opens its own session, SA_SIMULATE decides if it is simulated
+#Returns why the panel was skipped if tkinter cant open a window
+def benchmark_panel (repeats = 3, transfers = ('ascii',), cold = False, simulate = True):
+    import tkinter as tk
+    os.environ['SA_SIMULATE'] = '1' if simulate else '0'
+    start = time.perf_counter()
+    try:
+        panel_spec = importlib.util.spec_from_file_location('sa_panel', Path(__file__).with_name('Virtual SA Control Panel.py'))
+        panel = importlib.util.module_from_spec(panel_spec)
+        panel_spec.loader.exec_module(panel)
+    except tk.TclError as error:
+        print('panel skipped: ' + str(error))
+        return {'skipped': str(error)}
+    
+    #The window is up once the module has run, the SA is connected in the background after that
+    results = {'startup': time.perf_counter() - start}
+    try:
+        panel.root.withdraw()
+        finish_panel_request(panel, panel.connection)
+        results['connected'] = time.perf_counter() - start
+        if not panel.connected:
+            print('panel skipped: ' + panel.alphanumerics_var.get())
+            return dict(results, skipped=panel.alphanumerics_var.get())
+        panel.file_name_var.set('benchmark_export')
+        for transfer in transfers:
+            panel.transfer_mode = transfer
+            runs = {'refresh_figure_toolbar': [], 'set_sensitivity': [], 'export_data': []}
+            for x in range(repeats):
+                clear_caches(cold)
+                runs['refresh_figure_toolbar'].append(time_call(lambda: finish_panel_request(panel, panel.refresh_figure_toolbar())))
+                runs['set_sensitivity'].append(time_call(lambda: finish_panel_request(panel, panel.set_sensitivity())))
+                runs['export_data'].append(time_call(panel.export_data))
+            for name in runs:
+                summary = summarize(runs[name])
+                print_row(name + ' ' + transfer, summary)
+                results[name + ' ' + transfer] = summary
+    finally:
+        Path('SA_data/benchmark_export.sacap').unlink(missing_ok=True)
+        Path('SA_data/benchmark_export.csv').unlink(missing_ok=True)
+        panel.worker.stop()
+        panel.session.close()
+        panel.root.destroy()
+    return results
+
+#Runs every benchmark, prints the results, and saves them to output as JSON
+#output=None saves to SA_data/benchmark_<time>.json, options are given to the SA Simulator
+def run_benchmark (simulate = True, resource_name = None, repeats = 3, transfers = ('ascii',), cold = False, panel = True, output = None, **options):
+    if not simulate and resource_name is None:
+        resource_name = 'GPIB::11'
+    results = {'created': datetime.now(timezone.utc).astimezone().isoformat(), 'simulate': simulate, 'resource': resource_name,
+               'repeats': repeats, 'transfers': list(transfers), 'cold': cold, 'settle_mode': sa_lib.settle_mode, 'options': options}
+    
+    print_header()
+    results['connect'] = benchmark_connect(repeats, resource_name, simulate, **options)
+    with sa_lib.SASession(resource_name, simulate=simulate, **options) as session:
+        results['make_plot'] = benchmark_make_plot(session, repeats, transfers, cold)
+        print()
+        session.SA.print_summary()
+        results['bus'] = session.SA.summary() #Latency of every mnemonic over all the make_plot runs
+    if panel:
+        results['panel'] = benchmark_panel(repeats, transfers, cold, simulate)
+    else:
+        results['panel'] = {'skipped': 'no-panel'}
+    
+    if output is None:
+        Path('SA_data').mkdir(exist_ok=True)
+        output = 'SA_data/benchmark_' + datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d_T%H-%M-%S") + '.json'
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print('saved ' + str(output))
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Times make_plot and the control panel against the SA Simulator or an analyzer')
+    parser.add_argument('--hardware', action='store_true', help='use the analyzer on the bus instead of the simulator')
+    parser.add_argument('--resource', default=None, help='pyvisa resource name of the analyzer, GPIB::11 by default')
+    parser.add_argument('--repeats', type=int, default=3, help='runs of each benchmark')
+    parser.add_argument('--transfer', choices=['ascii', 'binary', 'both'], default='ascii', help='display transfer to time')
+    parser.add_argument('--cold', action='store_true', help='forget sensitivities and binary calibrations before every run')
+    parser.add_argument('--no-panel', action='store_true', help='skip the control panel benchmarks')
+    parser.add_argument('--time-scale', type=float, default=1.0, help='speeds up the simulated sweeps, 1 is real time')
+    parser.add_argument('--output', default=None, help='JSON file to save the results to')
+    args = parser.parse_args()
+    
+    transfers = ('ascii', 'binary') if args.transfer == 'both' else (args.transfer,)
+    options = {} if args.hardware else {'time_scale': args.time_scale}
+    run_benchmark(not args.hardware, args.resource, args.repeats, transfers, args.cold, not args.no_panel, args.output, **options)
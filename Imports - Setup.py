@@ -1,200 +1,1924 @@
-# -*- coding: utf-8 -*-
-"""
-Created on Fri Jul 25 10:11:47 2025
-
-@author: jackc
-
-Run this file to use the MakePlot function to get data from the Spectrum Analyzer
-"""
-
-import pyvisa 
-import numpy as np
-import matplotlib.pyplot as plt
-import re
-import time
-
-def initialize ():
-    rm = pyvisa.ResourceManager() #Assigns the resource manager to an easier to use form
-    
-    resource_tuple = rm.list_resources() #Gets a tuple with resources available to pyvisa
-    
-    #This loop iterates through the tuple retuned by list_resources to find the instrument using GPIB
-    #Then connects to it, assigning it to SA or 'Spectrum Analyzer'
-    for x in resource_tuple: 
-        if re.search("^GPIB", x) != None:
-            SA = rm.open_resource(x)
-            break
-    
-    SA.read_termination = '\r\n' #Correctly sets the read termination
-    SA.write_termination = '\r\n' #Correctly sets the write termination
-    return rm, SA
-
-def make_plot (MD = 1, AD = 0, SP = 14, IM = 'bodefull', PM = 'lin', PHAS = 0, line = 1, point_mark = 0):
-    #Checking for error states from the given inputs
-    if not (type(MD) or type(AD) or type(SP) or type(PHAS) or type(line) or type (point_mark)) is int:
-        raise TypeError("MD, AD, SP, SENS, line, and point_mark must all be integers")
-    if MD<1 or MD>4:
-        raise ValueError("MD must be between 1-4")
-    if AD<0 or AD>24999:
-        raise ValueError("AD must be between 0-24999")
-    if SP<1 or SP>14:
-        raise ValueError("SP must be 1-14")
-    if PHAS<0 or PHAS>1:
-        raise ValueError("PHAS must be 0 or 1")
-    if line<0 or line<1:
-        raise ValueError("line must be 0 or 1")
-    if point_mark<0 or point_mark>1:
-        raise ValueError("point_mark must be 0 or 1")
-    if not (type(IM) or type(PM)) is str:
-        raise TypeError("IM and PM must be strings")
-    IM = IM.lower()
-    if IM not in {'bodefull', 'bodehalf', 'a', 'b', 'bothhalf', 'bothfull'}:
-        raise ValueError("IM must be 'bodehalf' 'bodefull' 'a' 'b' 'bothhalf' or 'bothfull'")
-    PM = PM.lower()
-    if PM not in {'lin', 'logx', 'log', 'logy', 'logxy'}:
-        raise ValueError("PM must be 'lin' 'log' 'logx' 'logy' or 'logxy'")
-    if MD in {1, 2} and AD != 0:
-        raise ValueError("In MD 1 or 2 AD must be 0")
-        
-    #Initialize the connection, sets to PRS
-    rm, SA = initialize()
-    SA.write('PRS')
-    
-    #Implement the range selection and sets the sensitivity
-    SA.write('MD' + str(MD) + 'AD' + str(AD) + 'SP' + str(SP))
-    set_sensitivity()
-    
-    #Generate y array, time.sleep is there because SA is old and slow
-    if PHAS == 0:
-        if IM == 'bodefull':
-            AValues = SA.query_ascii_values('LDS', container=np.array)
-            time.sleep(0.5)
-            SA.write('IM3AA0AB1')
-            time.sleep(0.5)
-            BValues = SA.query_ascii_values('LDS', container=np.array)
-            YValues = BValues / AValues
-        elif IM == 'bodehalf':
-            SA.write('IM2AB1')
-            time.sleep(0.5)
-            AValues, BValues = np.split(SA.query_ascii_values('LDS', container=np.array), 2)
-            YValues = BValues / AValues
-        elif IM == 'a':
-            YValues = SA.query_ascii_values('LDS', container=np.array)
-        elif IM == 'b':
-            SA.write('IM3AA0AB1')
-            time.sleep(0.5)
-            YValues = SA.query_ascii_values('LDS', container=np.array)
-        elif IM == 'bothhalf':
-            SA.write('IM2AB1')
-            time.sleep(0.5)
-            YValues, YYValues = np.split(SA.query_ascii_values('LDS', container=np.array), 2)
-        else:
-            YValues = SA.query_ascii_values('LDS', container=np.array)
-            time.sleep(0.5)
-            SA.write('IM3AA0AB1')
-            time.sleep(0.5)
-            YYValues = SA.query_ascii_values('LDS', container=np.array)
-    else:
-        SA.write('AA0PA1')
-        if IM == 'bodefull':
-            AValues = SA.query_ascii_values('LDS', container=np.array)
-            time.sleep(0.5)
-            SA.write('IM3PA0PB1')
-            time.sleep(0.5)
-            BValues = SA.query_ascii_values('LDS', container=np.array)
-            YValues = BValues / AValues
-        elif IM == 'bodehalf':
-            SA.write('IM2PB1')
-            time.sleep(0.5)
-            AValues, BValues = np.split(SA.query_ascii_values('LDS', container=np.array), 2)
-            YValues = BValues / AValues
-        elif IM == 'a':
-            YValues = SA.query_ascii_values('LDS', container=np.array)
-        elif IM == 'b':
-            SA.write('IM3PA0PB1')
-            time.sleep(0.5)
-            YValues = SA.query_ascii_values('LDS', container=np.array)
-        elif IM == 'bothhalf':
-            SA.write('IM2PB1')
-            time.sleep(0.5)
-            YValues, YYValues = np.split(SA.query_ascii_values('LDS', container=np.array), 2)
-        else:
-            YValues = SA.query_ascii_values('LDS', container=np.array)
-            time.sleep(0.5)
-            SA.write('IM3PA0PB1')
-            time.sleep(0.5)
-            YYValues = SA.query_ascii_values('LDS', container=np.array)
-    
-    
-    #Generate Frequency array
-    if MD == 4:
-        FreqValues = np.linspace (SA.query_ascii_values('LAD')[0] - 0.5 * SA.query_ascii_values('LSP')[0], SA.query_ascii_values('LAD')[0] + 0.5 * SA.query_ascii_values('LSP')[0], num = YValues.size)
-    else:
-        FreqValues = np.linspace (SA.query_ascii_values('LAD')[0], SA.query_ascii_values('LSP')[0] + SA.query_ascii_values('LAD')[0], num = YValues.size)
-        
-    #Sets the line and point types
-    line_point = ''
-    if line == 1:
-        line_point = line_point + '-'
-    if point_mark == 1:
-        line_point = line_point + 'o'
-    if 1 not in {line, point_mark}:
-        line_point = '-'
-    
-    #Generate the plot
-    if IM != 'bothhalf' and IM != 'bothfull':
-        fig, ax = plt.subplots()
-        if PM == 'lin':
-            ax.plot(FreqValues, YValues, line_point)
-        elif PM == 'log' or PM == 'logx':
-            ax.semilogx(FreqValues, YValues, line_point)
-        elif PM == 'logy':
-            ax.semilogy(FreqValues, YValues, line_point)
-        else:
-            ax.loglog(FreqValues, YValues, line_point)
-        return_values = [FreqValues, YValues]
-    else:
-        fig, axs = plt.subplots(2, sharex=True)
-        axs[0].set_title('Plot of A')
-        axs[1].set_title('Plot of B')
-        if PM == 'lin':
-            axs[0].plot(FreqValues, YValues, line_point)
-            axs[1].plot(FreqValues, YYValues, line_point)
-        elif PM == 'log' or PM == 'logx':
-            axs[0].semilogx(FreqValues, YValues, line_point)
-            axs[1].semilogx(FreqValues, YYValues, line_point)
-        elif PM == 'logy':
-            axs[0].semilogy(FreqValues, YValues, line_point)
-            axs[1].semilogy(FreqValues, YYValues, line_point)
-        else:
-            axs[0].loglog(FreqValues, YValues, line_point)
-            axs[1].loglog(FreqValues, YYValues, line_point)
-        return_values = [FreqValues, YValues, YYValues]
-    
-    #return a list with the x/y arrays inside of it
-    return return_values
-    
-#Sets the sensitivity of the spectrum analyzer to the most sensitive it can be without overloading
-def set_sensitivity():
-    rm, SA = initialize() #initializes the resource manager and the spectrum analyzer
-    
-    AS = 10 #Starting value for A sensitivity
-    BS = 10 #Starting value for B sensitivity
-    
-    SA.write('AS' + str(AS) + 'BS' + str(BS) + 'IM2') #sets the sensitivities to the starting values
-    time.sleep(0.1)
-    status_word = SA.query_binary_values('LST1', datatype = 'uint8') #Reads the status word
-    
-    #This loop sets the sensitivity to the most sensitive option
-    while status_word & 4 or status_word & 8: #Checks if A overload or B overload flags are raised
-        if status_word & 4: #Decreases A sens if A overload flag is raised
-            AS=AS-1
-        if status_word & 8: #Decreases B sens if B overload flag is raised
-            BS=BS-1
-        if AS<2 or BS<2:
-            raise ValueError("Sensitivity went out of bounds") #Prevents sending the SA an invalid command
-        SA.write('AS' + str(AS) + 'BS' + str(BS))
-        SA.write('LST0') #reset status word
-        time.sleep(0.25) #waits to make sure an overload is caught if it will occur
-        status_word = SA.query_binary_values('LST1', datatype = 'uint8') #reads the status word
-
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Jul 25 10:11:47 2025
+
+@author: jackc
+
+Run this file to use the MakePlot function to get data from the Spectrum Analyzer
+"""
+
+import pyvisa 
+import numpy as np
+import re
+import time
+import sys
+import os
+import importlib.util
+from pathlib import Path
+import queue
+import threading
+import concurrent.futures
+import asyncio
+import contextlib
+import functools
+import inspect
+import copy
+import json
+import struct
+from datetime import datetime, timezone
+
+#Octal start address and number of words of the display memory, from Table A-3 in the attached PDF
+DISPLAY_ADDRESS = '74000'
+DISPLAY_WORDS = 512
+
+#Span of each SP setting in Hz, index 0 is SP1, from Table A-1 in the attached PDF
+SPAN_HZ = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000]
+MAX_FREQUENCY = 25000
+
+#Status word bits, from Table A-2 in the attached PDF
+ARM_LIGHT = 2
+A_OVERLOAD = 4
+B_OVERLOAD = 8
+TIME_RECORD_COMPLETE = 16
+SWEEP_COMPLETE = 32
+AVERAGE_COMPLETE = 64
+
+#State after PRS, from Table A-2 in the attached PDF
+PRESET_STATE = {'IM': 1, 'AC': 1, 'BC': 1, 'AS': 2, 'BS': 2, 'SL': 1, 'FR': 1, 'RP': 1, 'MD': 1, 'AD': 0, 'SP': 14,
+                'MN': 0, 'MR': 0, 'MB': 0, 'MT': 0, 'MP': 0, 'AA': 1, 'AB': 0, 'AX': 0, 'PA': 0, 'PB': 0, 'PX': 0,
+                'TA': 0, 'TB': 0, 'CH': 0, 'SC': 2, 'AM': 1, 'PS': 1, 'AV': 1, 'NU': 1, 'SH': 0, 'TR': 0, 'RR': 0}
+
+#Splits a command into its mnemonics and values, the listen commands and a few others are three letters
+COMMAND_PATTERN = r'(PRS|HLT|RUN|WTM|L[A-Z]{2}|[A-Z]{2})(-?[0-9.,]*)'
+
+#'poll' waits until the status word says the SA is ready, 'sleep' waits a fixed time instead
+settle_mode = 'poll'
+settle_timeout = 30 #Seconds to poll before giving up, narrow spans take a long time to sweep
+
+#Sensitivities found by autorange, keyed by the analyzer and the frequency settings they were found at
+sensitivity_memory = {}
+
+#Scale/offset found by calibrate_binary_transfer, keyed by whatever changes the units of the display
+binary_calibrations = {}
+
+#Front panel settings that change the units or scale of the display, a binary calibration is only good for the values they had
+DISPLAY_UNITS = ('SC', 'AM', 'AS', 'BS')
+
+#Adds up the time spent in each phase of an acquisition, set phase_timer to one to start timing
+#Phases dont nest, anything timed inside a phase counts towards the outer one (settling inside autorange is autorange)
+class PhaseTimer:
+    def __init__ (self):
+        self.totals = {}
+        self.active = None
+    
+    @contextlib.contextmanager
+    def phase (self, name):
+        if self.active is not None:
+            yield
+            return
+        self.active = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0) + time.perf_counter() - start
+            self.active = None
+
+#The PhaseTimer that timed adds to, None times nothing
+phase_timer = None
+
+#Times the code in a with block as phase name, if phase_timer is set
+def timed (name):
+    if phase_timer is None:
+        return contextlib.nullcontext()
+    return phase_timer.phase(name)
+
+#Loads another script in this folder as a module, their names have spaces in them so they cant be imported normally
+def load_script (file_name, module_name):
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, Path(__file__).with_name(file_name))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
+
+#Scripts that dont make their own SASession share this one, so the bus is only searched once
+default_session = None
+
+#Wraps the pyvisa resource and records every call to the SA, cheap enough to leave on all the time
+#The last capacity calls are kept in arrays made once, and every call is counted in a latency histogram for its mnemonic
+#Reads are recorded under the mnemonic that was last written, so the read after LDS shows up as LDS
+#Anything else is passed through to the resource
+class TracedResource:
+    KINDS = ('write', 'read', 'read_raw', 'read_bytes', 'query', 'query_ascii_values')
+    BIN_EDGES = np.logspace(-5, 2, 71) #10 us to 100 s, 10 bins a decade
+    OWN = ('resource', 'lock', 'capacity', 'kinds', 'mnemonics', 'sent', 'received', 'starts', 'durations', 'count', 'histograms', 'last_mnemonic')
+    
+    def __init__ (self, resource, capacity = 10000):
+        self.resource = resource
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.kinds = np.zeros(capacity, dtype=np.uint8)
+        self.mnemonics = np.zeros(capacity, dtype='U3')
+        self.sent = np.zeros(capacity, dtype=np.int32)
+        self.received = np.zeros(capacity, dtype=np.int32)
+        self.starts = np.zeros(capacity)
+        self.durations = np.zeros(capacity)
+        self.count = 0 #Every call ever recorded, the newest is at (count - 1) % capacity
+        self.histograms = {} #(mnemonic, kind) : counts in each bin of BIN_EDGES, plus one under and one over
+        self.last_mnemonic = ''
+    
+    def __getattr__ (self, name):
+        return getattr(self.resource, name)
+    
+    def __setattr__ (self, name, value):
+        if name in self.OWN:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.resource, name, value)
+    
+    #Returns the first mnemonic in a command, like MD for 'MD1AD0SP14'
+    @staticmethod
+    def mnemonic (command):
+        match = re.match(COMMAND_PATTERN, command.lstrip())
+        return match.group(1) if match else command[0:3]
+    
+    #Bytes a write puts on the bus, with its termination
+    def sent_bytes (self, message):
+        return len(message) + len(self.resource.write_termination or '')
+    
+    def record (self, kind, mnemonic, sent, received, start):
+        duration = time.perf_counter() - start
+        with self.lock:
+            x = self.count % self.capacity
+            self.kinds[x] = self.KINDS.index(kind)
+            self.mnemonics[x] = mnemonic
+            self.sent[x] = sent
+            self.received[x] = received
+            self.starts[x] = start
+            self.durations[x] = duration
+            self.count += 1
+            if (mnemonic, kind) not in self.histograms:
+                self.histograms[(mnemonic, kind)] = np.zeros(self.BIN_EDGES.size + 1, dtype=np.int64)
+            self.histograms[(mnemonic, kind)][np.searchsorted(self.BIN_EDGES, duration)] += 1
+    
+    def write (self, message, *args, **kwargs):
+        start = time.perf_counter()
+        self.last_mnemonic = self.mnemonic(message)
+        result = self.resource.write(message, *args, **kwargs)
+        self.record('write', self.last_mnemonic, self.sent_bytes(message), 0, start)
+        return result
+    
+    def read (self, *args, **kwargs):
+        start = time.perf_counter()
+        result = self.resource.read(*args, **kwargs)
+        self.record('read', self.last_mnemonic, 0, len(result), start)
+        return result
+    
+    def read_raw (self, *args, **kwargs):
+        start = time.perf_counter()
+        result = self.resource.read_raw(*args, **kwargs)
+        self.record('read_raw', self.last_mnemonic, 0, len(result), start)
+        return result
+    
+    def read_bytes (self, count, *args, **kwargs):
+        start = time.perf_counter()
+        result = self.resource.read_bytes(count, *args, **kwargs)
+        self.record('read_bytes', self.last_mnemonic, 0, len(result), start)
+        return result
+    
+    def query (self, message, *args, **kwargs):
+        start = time.perf_counter()
+        self.last_mnemonic = self.mnemonic(message)
+        result = self.resource.query(message, *args, **kwargs)
+        self.record('query', self.last_mnemonic, self.sent_bytes(message), len(result), start)
+        return result
+    
+    #Reads the raw reply so the bytes can be counted, then parses it the way pyvisa does
+    def query_ascii_values (self, message, converter = 'f', separator = ',', container = list, delay = None):
+        start = time.perf_counter()
+        self.last_mnemonic = self.mnemonic(message)
+        self.resource.write(message)
+        if delay is not None:
+            time.sleep(delay)
+        raw = self.resource.read_raw()
+        self.record('query_ascii_values', self.last_mnemonic, self.sent_bytes(message), len(raw), start)
+        return pyvisa.util.from_ascii_block(raw.decode('ascii'), converter, separator, container)
+    
+    #Returns the recorded calls that are still kept, oldest first, as a numpy structured array
+    def trace (self):
+        with self.lock:
+            order = np.arange(max(self.count - self.capacity, 0), self.count) % self.capacity
+            records = np.zeros(order.size, dtype=[('kind', 'U18'), ('mnemonic', 'U3'), ('sent', np.int32), ('received', np.int32), ('start', float), ('duration', float)])
+            records['kind'] = np.array(self.KINDS)[self.kinds[order]]
+            records['mnemonic'] = self.mnemonics[order]
+            records['sent'] = self.sent[order]
+            records['received'] = self.received[order]
+            records['start'] = self.starts[order]
+            records['duration'] = self.durations[order]
+        return records
+    
+    #Returns the p percentile of a histogram, as the top edge of the bin it falls in
+    def percentile (self, counts, p):
+        x = np.searchsorted(np.cumsum(counts), p / 100 * counts.sum())
+        return float(self.BIN_EDGES[x]) if x < self.BIN_EDGES.size else np.inf
+    
+    #Returns the calls, total time, p50, p95, and p99 (in seconds) of every mnemonic and kind, slowest total first
+    #The totals are from the calls still kept, the percentiles are from every call
+    def summary (self):
+        records = self.trace()
+        with self.lock:
+            histograms = {key: counts.copy() for key, counts in self.histograms.items()}
+        results = {}
+        for (mnemonic, kind), counts in histograms.items():
+            kept = (records['mnemonic'] == mnemonic) & (records['kind'] == kind)
+            results[mnemonic + ' ' + kind] = {'calls': int(counts.sum()), 'total': float(records['duration'][kept].sum()),
+                                              'bytes': int(records['sent'][kept].sum() + records['received'][kept].sum()),
+                                              'p50': self.percentile(counts, 50), 'p95': self.percentile(counts, 95), 'p99': self.percentile(counts, 99)}
+        return dict(sorted(results.items(), key=lambda item: item[1]['total'], reverse=True))
+    
+    #Prints the summary as a table in ms
+    def print_summary (self):
+        print(f"{'':<24}{'calls':>8}{'total ms':>12}{'bytes':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, x in self.summary().items():
+            print(f"{name:<24}{x['calls']:>8}{x['total'] * 1000:>12.1f}{x['bytes']:>10}{x['p50'] * 1000:>10.2f}{x['p95'] * 1000:>10.2f}{x['p99'] * 1000:>10.2f}")
+    
+    #Saves the recorded calls as a csv, start is in seconds from the first call kept
+    def dump (self, file_name):
+        records = self.trace()
+        if records.size:
+            records['start'] -= records['start'][0]
+        np.savetxt(file_name, records, fmt=['%s', '%s', '%d', '%d', '%.6f', '%.6f'], delimiter=',', header='kind,mnemonic,sent,received,start (s),duration (s)', comments='')
+
+#Mirrors the settings of the SA so a setting it already has is not sent again
+#Only what has been sent is known, so nothing is known until a PRS or until a setting is sent
+#The replies to the list commands in CACHED are kept until a setting changes, a PRS, or invalidate()
+#Changes made on the front panel cant be seen over the bus, call invalidate() after touching the knobs
+class InstrumentState:
+    CACHED = ('LAD', 'LSP', 'LAS', 'LBS', 'LXS')
+    
+    def __init__ (self):
+        self.settings = {} #mnemonic : value the SA has
+        self.replies = {} #(query, kind) : reply from the SA
+    
+    #Forgets every setting and reply, so everything is sent and asked again
+    def invalidate (self):
+        self.settings = {}
+        self.replies = {}
+    
+    #Returns command without the settings the SA already has, and counts what is left as sent
+    #PRS is dropped if the SA is known to be in the preset state already
+    def changes (self, command):
+        parts = []
+        for mnemonic, value in re.findall(COMMAND_PATTERN, command.upper()):
+            if mnemonic == 'PRS':
+                if self.settings == PRESET_STATE:
+                    continue
+                self.settings = dict(PRESET_STATE)
+                self.replies = {}
+            elif mnemonic == 'WTM':
+                self.invalidate() #Writing memory can change anything
+            elif len(mnemonic) == 2 and value != '' and ',' not in value:
+                if self.settings.get(mnemonic) == float(value):
+                    continue
+                self.settings[mnemonic] = float(value)
+                self.replies = {}
+            parts.append(mnemonic + value)
+        return ''.join(parts)
+    
+    #Returns the command that puts the SA in the preset state with settings changed, leaving out the mnemonics in keep
+    #If any of it is unknown it starts with PRS, otherwise only the settings that differ are in it
+    def setup (self, settings, keep = ()):
+        target = dict(PRESET_STATE)
+        target.update(settings)
+        for x in keep:
+            target.pop(x, None)
+        if all(x in self.settings for x in target):
+            current, command = self.settings, ''
+        else:
+            current, command = PRESET_STATE, 'PRS'
+        for x in target:
+            if current.get(x) != target[x]:
+                command = command + x + ('%g' % target[x])
+        return command
+
+#Wraps the pyvisa resource and sends writes through an InstrumentState, so settings the SA already has are left out
+#A write with nothing left in it is not sent at all, and the list commands in InstrumentState.CACHED are answered from the cache
+#Anything else is passed through to the resource
+class MirroredResource:
+    OWN = ('resource', 'state')
+    
+    def __init__ (self, resource, state):
+        self.resource = resource
+        self.state = state
+    
+    def __getattr__ (self, name):
+        return getattr(self.resource, name)
+    
+    def __setattr__ (self, name, value):
+        if name in self.OWN:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.resource, name, value)
+    
+    def write (self, message, *args, **kwargs):
+        command = self.state.changes(message)
+        if command == '':
+            return 0
+        try:
+            return self.resource.write(command, *args, **kwargs)
+        except BaseException:
+            self.state.invalidate() #Not known what made it to the SA
+            raise
+    
+    #Asks the SA, or the cache if message is a cached list command
+    def cached (self, message, kind, ask):
+        key = (message.strip().upper(), kind)
+        if key[0] not in self.state.CACHED:
+            return ask()
+        if key not in self.state.replies:
+            self.state.replies[key] = ask()
+        return copy.copy(self.state.replies[key])
+    
+    def query (self, message, *args, **kwargs):
+        return self.cached(message, 'query', lambda: self.resource.query(message, *args, **kwargs))
+    
+    def query_ascii_values (self, message, *args, **kwargs):
+        return self.cached(message, ('values', args, tuple(kwargs.items())), lambda: self.resource.query_ascii_values(message, *args, **kwargs))
+
+#Holds one connection to the spectrum analyzer so the resource manager, bus search, and terminations are only done once
+#Can be used with open/close or as a context manager, with SASession() as session:
+#simulate=True uses a SimulatedResourceManager from SA Simulator.py instead of the bus, options are given to it
+#trace=True wraps SA in a TracedResource so every call to it is recorded
+#mirror=True sends SA's writes through state, an InstrumentState, so settings that dont change are not sent again
+class SASession:
+    def __init__ (self, resource_name = None, rm = None, simulate = False, trace = True, mirror = True, **options):
+        self.resource_name = resource_name #None finds the first GPIB instrument when opened
+        self.rm = rm
+        self.SA = None
+        self.own_rm = rm is None #Only closes the resource manager if it made it
+        self.simulate = simulate
+        self.trace = trace
+        self.mirror = mirror
+        self.state = InstrumentState()
+        self.options = options
+    
+    def open (self):
+        if self.SA is not None:
+            return self
+        with timed('connect'):
+            self.connect()
+        return self
+    
+    def connect (self):
+        if self.rm is None:
+            self.rm = open_resource_manager(self.simulate, **self.options)
+        if self.resource_name is None:
+            self.resource_name = find_analyzer(self.rm)
+        self.SA = self.rm.open_resource(self.resource_name)
+        self.SA.read_termination = '\r\n' #Correctly sets the read termination
+        self.SA.write_termination = '\r\n' #Correctly sets the write termination
+        if self.trace:
+            self.SA = TracedResource(self.SA)
+        if self.mirror:
+            self.state.invalidate() #A new connection, the SA could have been changed since
+            self.SA = MirroredResource(self.SA, self.state)
+    
+    def close (self):
+        if self.SA is not None:
+            self.SA.close()
+            self.SA = None
+        if self.own_rm and self.rm is not None:
+            self.rm.close()
+            self.rm = None
+    
+    def __enter__ (self):
+        return self.open()
+    
+    def __exit__ (self, *args):
+        self.close()
+
+#Returns a pyvisa resource manager, or a SimulatedResourceManager from SA Simulator.py made with options if simulate is True
+def open_resource_manager (simulate = False, **options):
+    if simulate:
+        return load_script('SA Simulator.py', 'sa_simulator').SimulatedResourceManager(**options)
+    return pyvisa.ResourceManager() #Assigns the resource manager to an easier to use form
+
+#Returns the names of every GPIB instrument in the resource manager, on every bus
+def find_analyzers (rm):
+    resource_tuple = rm.list_resources() #Gets a tuple with resources available to pyvisa
+    analyzers = [x for x in resource_tuple if re.search("^GPIB", x) != None]
+    if not analyzers:
+        raise ValueError("No GPIB instrument was found")
+    return analyzers
+
+#Returns the name of the first GPIB instrument in the resource manager
+def find_analyzer (rm):
+    return find_analyzers(rm)[0]
+
+#Returns the bus a resource is on, 'GPIB1::11::INSTR' is on 'GPIB1', and 'GPIB::11' is on board 0 so it is 'GPIB0'
+def bus_name (resource_name):
+    board = re.match("^GPIB([0-9]*)", resource_name.upper())
+    if board is None:
+        raise ValueError(resource_name + " is not a GPIB resource")
+    return 'GPIB' + (board.group(1) or '0')
+
+#Returns the shared session, opening it the first time it is needed
+def get_session ():
+    global default_session
+    if default_session is None:
+        default_session = SASession()
+    return default_session.open()
+
+#Returns the resource manager and spectrum analyzer ('SA') of the shared session
+def initialize ():
+    session = get_session()
+    return session.rm, session.SA
+
+#The result of acquire, frequencies is the frequency array and values is a list of one or two y arrays called names
+#settings has what it was taken with, including the sensitivities, and timestamp is when the display was read
+class Acquisition:
+    def __init__ (self, frequencies, values, names, settings, timestamp = None):
+        self.frequencies = frequencies
+        self.values = values
+        self.names = names
+        self.settings = settings
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc).astimezone()
+        self.timestamp = timestamp
+    
+    #Returns a list with the x/y arrays inside of it, like make_plot
+    def as_list (self):
+        return [self.frequencies] + list(self.values)
+
+#Names of the y arrays of each IM
+IM_NAMES = {'bodefull': ['B/A'], 'bodehalf': ['B/A'], 'a': ['A'], 'b': ['B'], 'bothhalf': ['A', 'B'], 'bothfull': ['A', 'B']}
+
+#Checks the plot arguments of make_plot and plot_acquisition, returns PM in lower case
+def check_plot_style (PM, line, point_mark):
+    if not (type(line) or type (point_mark)) is int:
+        raise TypeError("line and point_mark must be integers")
+    if line<0 or line<1:
+        raise ValueError("line must be 0 or 1")
+    if point_mark<0 or point_mark>1:
+        raise ValueError("point_mark must be 0 or 1")
+    if not type(PM) is str:
+        raise TypeError("PM must be a string")
+    PM = PM.lower()
+    if PM not in {'lin', 'logx', 'log', 'logy', 'logxy'}:
+        raise ValueError("PM must be 'lin' 'log' 'logx' 'logy' or 'logxy'")
+    return PM
+
+#Reads the display without plotting anything, returns an Acquisition
+#Takes the same MD, AD, SP, IM, PHAS, transfer, and session as make_plot
+#settings has any other front panel settings to measure with as mnemonics, like {'AC': 2, 'PS': 3}, everything else is preset
+def acquire (MD = 1, AD = 0, SP = 14, IM = 'bodefull', PHAS = 0, transfer = 'ascii', session = None, settings = None):
+    #Checking for error states from the given inputs
+    if not (type(MD) or type(AD) or type(SP) or type(PHAS)) is int:
+        raise TypeError("MD, AD, SP, and PHAS must all be integers")
+    if MD<1 or MD>4:
+        raise ValueError("MD must be between 1-4")
+    if AD<0 or AD>24999:
+        raise ValueError("AD must be between 0-24999")
+    if SP<1 or SP>14:
+        raise ValueError("SP must be 1-14")
+    if PHAS<0 or PHAS>1:
+        raise ValueError("PHAS must be 0 or 1")
+    if not type(IM) is str:
+        raise TypeError("IM must be a string")
+    IM = IM.lower()
+    if IM not in {'bodefull', 'bodehalf', 'a', 'b', 'bothhalf', 'bothfull'}:
+        raise ValueError("IM must be 'bodehalf' 'bodefull' 'a' 'b' 'bothhalf' or 'bothfull'")
+    if MD in {1, 2} and AD != 0:
+        raise ValueError("In MD 1 or 2 AD must be 0")
+    transfer = transfer.lower()
+    if transfer not in {'ascii', 'binary'}:
+        raise ValueError("transfer must be 'ascii' or 'binary'")
+    
+    #Uses the given session or the shared one
+    if session is None:
+        session = get_session()
+    SA = session.SA
+    
+    averaging = configure(session, MD, AD, SP, IM, PHAS, settings)
+    AS, BS = set_sensitivity(session, (session.resource_name, MD, AD, SP))
+    key = (session.resource_name, IM, PHAS) + display_units(session) #Everything that changes the units of the display for this plot
+    ready = start_averaging(SA, averaging)
+    if ready == AVERAGE_COMPLETE:
+        wait_ready(SA, ready, 0.5)
+    
+    YValues, YYValues = read_traces(SA, IM, PHAS, transfer, key, ready)
+    timestamp = datetime.now(timezone.utc).astimezone()
+    
+    #Generate Frequency array
+    with timed('frequency axis'):
+        FreqValues = frequency_axis(MD, AD, SP, YValues.size)
+    
+    values = [YValues] if YYValues is None else [YValues, YYValues]
+    settings = dict(settings or {}, MD=MD, AD=AD, SP=SP, IM=IM, PHAS=PHAS, AS=AS, BS=BS, transfer=transfer)
+    return Acquisition(FreqValues, values, IM_NAMES[IM], settings, timestamp)
+
+#Plots an Acquisition from acquire or zoom_sweep and returns the figure, with PM, line, and point_mark like make_plot
+#matplotlib is only imported the first time something is plotted, so scripts that only acquire never load it
+def plot_acquisition (acquisition, PM = 'lin', line = 1, point_mark = 0):
+    PM = check_plot_style(PM, line, point_mark)
+    import matplotlib.pyplot as plt
+    FreqValues = acquisition.frequencies
+    
+    #Sets the line and point types
+    line_point = ''
+    if line == 1:
+        line_point = line_point + '-'
+    if point_mark == 1:
+        line_point = line_point + 'o'
+    if 1 not in {line, point_mark}:
+        line_point = '-'
+    
+    #Generate the plot
+    with timed('plot'):
+        if len(acquisition.values) == 1:
+            YValues = acquisition.values[0]
+            fig, ax = plt.subplots()
+            if PM == 'lin':
+                ax.plot(FreqValues, YValues, line_point)
+            elif PM == 'log' or PM == 'logx':
+                ax.semilogx(FreqValues, YValues, line_point)
+            elif PM == 'logy':
+                ax.semilogy(FreqValues, YValues, line_point)
+            else:
+                ax.loglog(FreqValues, YValues, line_point)
+        else:
+            YValues, YYValues = acquisition.values
+            fig, axs = plt.subplots(2, sharex=True)
+            axs[0].set_title('Plot of ' + acquisition.names[0])
+            axs[1].set_title('Plot of ' + acquisition.names[1])
+            if PM == 'lin':
+                axs[0].plot(FreqValues, YValues, line_point)
+                axs[1].plot(FreqValues, YYValues, line_point)
+            elif PM == 'log' or PM == 'logx':
+                axs[0].semilogx(FreqValues, YValues, line_point)
+                axs[1].semilogx(FreqValues, YYValues, line_point)
+            elif PM == 'logy':
+                axs[0].semilogy(FreqValues, YValues, line_point)
+                axs[1].semilogy(FreqValues, YYValues, line_point)
+            else:
+                axs[0].loglog(FreqValues, YValues, line_point)
+                axs[1].loglog(FreqValues, YYValues, line_point)
+    return fig
+
+#Reads the display with acquire and plots it with plot_acquisition
+def make_plot (MD = 1, AD = 0, SP = 14, IM = 'bodefull', PM = 'lin', PHAS = 0, line = 1, point_mark = 0, transfer = 'ascii', session = None):
+    PM = check_plot_style(PM, line, point_mark) #Checked first so a bad argument doesnt cost a measurement
+    acquisition = acquire(MD, AD, SP, IM, PHAS, transfer, session)
+    plot_acquisition(acquisition, PM, line, point_mark)
+    
+    #return a list with the x/y arrays inside of it
+    return acquisition.as_list()
+
+#Sets the SA to PRS with the range selection and the traces read_traces reads first, only what changed since the last setup is sent
+#IM2 is what set_sensitivity leaves it in, and the sensitivities are left to set_sensitivity
+#settings has any other settings to change from the preset, the ones configure sets itself cant be changed by it
+#The SA's own averaging in settings is left off since autorange would restart it, it is returned for start_averaging to turn on after autorange
+def configure (session, MD, AD, SP, IM, PHAS, settings = None):
+    if PHAS == 0:
+        traces = {'AB': 1} if IM in {'bodehalf', 'bothhalf'} else {}
+    else:
+        traces = {'AA': 0, 'PA': 1, 'PB': 1} if IM in {'bodehalf', 'bothhalf'} else {'AA': 0, 'PA': 1}
+    settings, averaging = split_averaging(settings)
+    with timed('configure'):
+        session.SA.write(session.state.setup(dict(settings, **traces, IM=2, MD=MD, AD=AD, SP=SP), keep=('AS', 'BS')))
+    return averaging
+
+#Settings of the SA's own averaging, they are turned on after autorange since every sensitivity it tries restarts the average
+AVERAGING_SETTINGS = ('AV', 'NU')
+
+#Returns a copy of settings without AVERAGING_SETTINGS, and the averaging settings that were in it
+def split_averaging (settings):
+    settings = dict(settings or {})
+    return settings, {x: settings.pop(x) for x in AVERAGING_SETTINGS if x in settings}
+
+#Turns on the averaging from split_averaging, after autorange
+#Returns the status bit that says a display is finished, AVERAGE_COMPLETE when the SA is averaging and SWEEP_COMPLETE when it isnt
+#settle_timeout has to be long enough for the whole average, AV2NU4 is 32 sweeps
+def start_averaging (SA, averaging):
+    if float(averaging.get('AV', 1)) == 1:
+        return SWEEP_COMPLETE
+    SA.write(''.join(x + '%g' % float(averaging[x]) for x in AVERAGING_SETTINGS if x in averaging))
+    return AVERAGE_COMPLETE
+
+#Returns the values the SA has for DISPLAY_UNITS, for the binary calibration key of what is on the display
+#Called after configure and set_sensitivity, so every one of them is known
+def display_units (session):
+    return tuple(session.state.settings.get(x) for x in DISPLAY_UNITS)
+
+#Reads the traces for IM from the display, after configure and set_sensitivity
+#ready is the status bit from start_averaging that is waited for after the input mode changes
+#Returns YValues and YYValues, YYValues is None unless IM is 'bothhalf' or 'bothfull'
+def read_traces (SA, IM, PHAS, transfer, key, ready = SWEEP_COMPLETE):
+    YYValues = None
+    
+    #Generate y array, wait_ready is there because SA is old and slow
+    if PHAS == 0:
+        if IM == 'bodefull':
+            AValues = read_display(SA, transfer, key + ('A',), ready=ready)
+            wait_ready(SA, 0, 0.5)
+            SA.write('IM3AA0AB1')
+            wait_ready(SA, ready, 0.5)
+            BValues = read_display(SA, transfer, key + ('B',), ready=ready)
+            YValues = BValues / AValues
+        elif IM == 'bodehalf':
+            SA.write('IM2AB1')
+            wait_ready(SA, ready, 0.5)
+            AValues, BValues = np.split(read_display(SA, transfer, key + ('AB',), ready=ready), 2)
+            YValues = BValues / AValues
+        elif IM == 'a':
+            YValues = read_display(SA, transfer, key + ('A',), ready=ready)
+        elif IM == 'b':
+            SA.write('IM3AA0AB1')
+            wait_ready(SA, ready, 0.5)
+            YValues = read_display(SA, transfer, key + ('B',), ready=ready)
+        elif IM == 'bothhalf':
+            SA.write('IM2AB1')
+            wait_ready(SA, ready, 0.5)
+            YValues, YYValues = np.split(read_display(SA, transfer, key + ('AB',), ready=ready), 2)
+        else:
+            YValues = read_display(SA, transfer, key + ('A',), ready=ready)
+            wait_ready(SA, 0, 0.5)
+            SA.write('IM3AA0AB1')
+            wait_ready(SA, ready, 0.5)
+            YYValues = read_display(SA, transfer, key + ('B',), ready=ready)
+    else:
+        SA.write('AA0PA1')
+        if IM == 'bodefull':
+            AValues = read_display(SA, transfer, key + ('A',), ready=ready)
+            wait_ready(SA, 0, 0.5)
+            SA.write('IM3PA0PB1')
+            wait_ready(SA, ready, 0.5)
+            BValues = read_display(SA, transfer, key + ('B',), ready=ready)
+            YValues = BValues / AValues
+        elif IM == 'bodehalf':
+            SA.write('IM2PB1')
+            wait_ready(SA, ready, 0.5)
+            AValues, BValues = np.split(read_display(SA, transfer, key + ('AB',), ready=ready), 2)
+            YValues = BValues / AValues
+        elif IM == 'a':
+            YValues = read_display(SA, transfer, key + ('A',), ready=ready)
+        elif IM == 'b':
+            SA.write('IM3PA0PB1')
+            wait_ready(SA, ready, 0.5)
+            YValues = read_display(SA, transfer, key + ('B',), ready=ready)
+        elif IM == 'bothhalf':
+            SA.write('IM2PB1')
+            wait_ready(SA, ready, 0.5)
+            YValues, YYValues = np.split(read_display(SA, transfer, key + ('AB',), ready=ready), 2)
+        else:
+            YValues = read_display(SA, transfer, key + ('A',), ready=ready)
+            wait_ready(SA, 0, 0.5)
+            SA.write('IM3PA0PB1')
+            wait_ready(SA, ready, 0.5)
+            YYValues = read_display(SA, transfer, key + ('B',), ready=ready)
+    return YValues, YYValues
+
+#Plans the (MD, AD, SP) segments that cover start to stop Hz with points no further apart than resolution Hz
+#Uses the widest span that is fine enough, so there are as few segments as possible, and they are in order of AD
+#Neighbouring zoom segments overlap by the fraction overlap, since the edges of a zoomed display roll off
+#points is the number of points per trace, 256 or 128 for the half modes
+def plan_sweep (start, stop, resolution, overlap = 0.1, points = 256):
+    if start < 0 or stop > MAX_FREQUENCY or stop <= start:
+        raise ValueError("The band must be inside 0-25000 Hz with start below stop")
+    if resolution < SPAN_HZ[0] / points:
+        raise ValueError("resolution must be at least " + str(SPAN_HZ[0] / points) + " Hz")
+    if overlap < 0 or overlap >= 0.5:
+        raise ValueError("overlap must be between 0 and 0.5")
+    SP = max(x + 1 for x in range(len(SPAN_HZ)) if SPAN_HZ[x] / points <= resolution)
+    span = SPAN_HZ[SP - 1]
+    
+    #The whole band or a band from 0 fits in one display without zooming
+    if SP == 14:
+        return [(1, 0, 14)]
+    if start == 0 and stop <= span:
+        return [(2, 0, SP)]
+    
+    #Zoomed segments from start, AD is a whole number of Hz and a segment cant go past 25 kHz
+    step = max(int(span * (1 - overlap)), 1)
+    highest = int(np.floor(MAX_FREQUENCY - span))
+    first = min(int(np.floor(start)), highest)
+    last = min(int(np.ceil(stop - span)), highest)
+    if last <= first:
+        return [(3, first, SP)]
+    ADs = np.round(np.linspace(first, last, int(np.ceil((last - first) / step)) + 1))
+    return [(3, int(AD), SP) for AD in ADs]
+
+#Returns the frequencies of the points of a display at MD, AD, SP, worked out from SPAN_HZ without asking the SA
+#The last few axes are kept, so the same settings get back the same array without making a new one
+#The arrays are read only since they are shared, copy one before changing it
+@functools.lru_cache(maxsize=32)
+def frequency_axis (MD, AD, SP, points):
+    span = SPAN_HZ[SP - 1]
+    if MD == 1:
+        axis = np.linspace(0, MAX_FREQUENCY, num=points)
+    elif MD == 2:
+        axis = np.linspace(0, span, num=points)
+    elif MD == 4: #Set center
+        axis = np.linspace(AD - 0.5 * span, AD + 0.5 * span, num=points)
+    else: #Set start
+        axis = np.linspace(AD, AD + span, num=points)
+    axis.flags.writeable = False
+    return axis
+
+#Puts the segments of a sweep together into one array, trimmed to start to stop
+#Where two segments overlap each keeps the half of the overlap nearest its middle, away from its rolled off edge
+def stitch_segments (frequencies, values, start, stop):
+    lows = np.array([x[0] for x in frequencies])
+    highs = np.array([x[-1] for x in frequencies])
+    cuts = np.concatenate(([start], (lows[1:] + highs[:-1]) / 2, [stop]))
+    segment = np.repeat(np.arange(len(frequencies)), [x.size for x in frequencies])
+    frequency = np.concatenate(frequencies)
+    keep = (frequency >= cuts[segment]) & ((frequency < cuts[segment + 1]) | ((segment == len(frequencies) - 1) & (frequency <= stop)))
+    return frequency[keep], [np.concatenate(x)[keep] for x in values]
+
+#Measures start to stop Hz with points no further apart than resolution Hz, by zooming in on as few segments as it takes
+#The segments are measured in order of AD so only AD changes between them, and the sensitivities found for one are tried first on the next
+#Returns an Acquisition like acquire, its settings have the band, resolution, and the plan that was measured
+#settings are other front panel settings like acquire's
+def zoom_sweep (start, stop, resolution, IM = 'a', PHAS = 0, transfer = 'ascii', overlap = 0.1, session = None, settings = None):
+    IM = IM.lower()
+    if IM not in {'bodefull', 'bodehalf', 'a', 'b', 'bothhalf', 'bothfull'}:
+        raise ValueError("IM must be 'bodehalf' 'bodefull' 'a' 'b' 'bothhalf' or 'bothfull'")
+    points = 128 if IM in {'bodehalf', 'bothhalf'} else 256
+    plan = plan_sweep(start, stop, resolution, overlap, points)
+    if session is None:
+        session = get_session()
+    
+    frequencies, values = [], [[], []]
+    last = None
+    for MD, AD, SP in plan:
+        averaging = configure(session, MD, AD, SP, IM, PHAS, settings)
+        if last is not None and (session.resource_name, MD, AD, SP) not in sensitivity_memory:
+            sensitivity_memory[(session.resource_name, MD, AD, SP)] = last
+        last = set_sensitivity(session, (session.resource_name, MD, AD, SP))
+        key = (session.resource_name, IM, PHAS) + display_units(session)
+        ready = start_averaging(session.SA, averaging)
+        if ready == AVERAGE_COMPLETE:
+            wait_ready(session.SA, ready, 0.5)
+        YValues, YYValues = read_traces(session.SA, IM, PHAS, transfer, key, ready)
+        frequencies.append(frequency_axis(MD, AD, SP, YValues.size))
+        values[0].append(YValues)
+        values[1].append(YYValues)
+    
+    if values[1][0] is None:
+        values = values[0:1]
+    frequency, values = stitch_segments(frequencies, values, start, stop)
+    settings = dict(settings or {}, start=start, stop=stop, resolution=resolution, IM=IM, PHAS=PHAS, transfer=transfer, plan=plan)
+    return Acquisition(frequency, values, IM_NAMES[IM], settings)
+
+#Traces read by transfer_function at each resolution, each group is one display read
+TRANSFER_GROUPS = {'half': [('AA', 'AB'), ('PA', 'PB')], 'full': [('AA',), ('AB',), ('PA',), ('PB',)]}
+
+#Returns the median time of a display read on SA from what its TracedResource has recorded, or None if it hasnt done one
+def display_read_time (SA, transfer = 'ascii'):
+    if not hasattr(SA, 'summary'):
+        return None
+    recorded = SA.summary().get('LDS read_raw' if transfer == 'ascii' else 'LFM read_bytes')
+    return None if recorded is None else recorded['p50']
+
+#Measures the amplitude and phase of both channels from one sweep in IM2, and the transfer function H = B/A from them
+#The sweep is held in single sweep (RP0) while its traces are read, then the SA is put back in RP1
+#resolution='half' shows two traces at a time, so it is two display reads of 128 points, 'full' is four display reads of 256 points
+#resolution='auto' uses full if four display reads fit in budget seconds, going by the reads already done on this session
+#Points where A is more than floor below its largest point are NaN in H instead of dividing by next to nothing
+#Returns an Acquisition with the complex spectra of A and B (in V) and H, np.abs and np.angle give their magnitude and phase
+#settings are other front panel settings like acquire's
+def transfer_function (MD = 1, AD = 0, SP = 14, resolution = 'half', budget = None, floor = 1e-3, transfer = 'ascii', session = None, settings = None):
+    if MD<1 or MD>4:
+        raise ValueError("MD must be between 1-4")
+    if SP<1 or SP>14:
+        raise ValueError("SP must be 1-14")
+    if MD in {1, 2} and AD != 0:
+        raise ValueError("In MD 1 or 2 AD must be 0")
+    if resolution not in {'half', 'full', 'auto'}:
+        raise ValueError("resolution must be 'half' 'full' or 'auto'")
+    transfer = transfer.lower()
+    if transfer not in {'ascii', 'binary'}:
+        raise ValueError("transfer must be 'ascii' or 'binary'")
+    if session is None:
+        session = get_session()
+    SA = session.SA
+    if resolution == 'auto':
+        read_time = display_read_time(SA, transfer)
+        resolution = 'full' if budget is not None and read_time is not None and 4 * read_time <= budget else 'half'
+    groups = TRANSFER_GROUPS[resolution]
+    
+    #Everything is read in IM2, which is where set_sensitivity leaves the SA, so the input mode never changes
+    shown = {x: 1 if x in groups[0] else 0 for x in ('AA', 'AB', 'PA', 'PB', 'AX', 'PX', 'CH')}
+    setup, averaging = split_averaging(settings)
+    with timed('configure'):
+        SA.write(session.state.setup(dict(setup, **shown, IM=2, MD=MD, AD=AD, SP=SP, SC=2), keep=('AS', 'BS')))
+    AS, BS = set_sensitivity(session, (session.resource_name, MD, AD, SP))
+    
+    #Every trace is from the same held sweep, only what is shown changes between reads
+    traces = {}
+    try:
+        if hold_sweep(SA, start_averaging(SA, averaging)) & (A_OVERLOAD | B_OVERLOAD):
+            raise ValueError("The SA overloaded during the sweep")
+        for x, group in enumerate(groups):
+            if x > 0:
+                SA.write(''.join(name + ('1' if name in group else '0') for name in groups[x - 1] + group))
+                wait_ready(SA, 0, 0.1)
+            values = read_display(SA, transfer, (session.resource_name, 'transfer') + group + display_units(session), held=True)
+            traces.update(zip(group, np.split(values, len(group))))
+    finally:
+        SA.write('RP1')
+    timestamp = datetime.now(timezone.utc).astimezone()
+    
+    #The amplitudes are shown in dBV and the phases in degrees
+    A = 10 ** (traces['AA'] / 20) * np.exp(1j * np.radians(traces['PA']))
+    B = 10 ** (traces['AB'] / 20) * np.exp(1j * np.radians(traces['PB']))
+    H = np.full(A.size, np.nan, dtype=complex)
+    np.divide(B, A, out=H, where=np.abs(A) > floor * np.abs(A).max())
+    
+    with timed('frequency axis'):
+        frequencies = frequency_axis(MD, AD, SP, A.size)
+    settings = dict(settings or {}, MD=MD, AD=AD, SP=SP, IM='transfer', AS=AS, BS=BS, resolution=resolution, floor=floor, transfer=transfer)
+    return Acquisition(frequencies, [A, B, H], ['A', 'B', 'H'], settings, timestamp)
+
+#Sets the sensitivity of the spectrum analyzer to the most sensitive it can be without overloading
+#key is the frequency settings, the last sensitivities found for them are tried first
+def set_sensitivity(session = None, key = None):
+    if session is None:
+        session = get_session() #Only opens the spectrum analyzer if it isnt open already
+    with timed('autorange'):
+        return autorange(session.SA, key, 'IM2') #IM2 so that both overload flags are set
+
+#Bisects the sensitivity of one channel between 2 (30 V) and 10 (3 mV)
+#Assumes that if a sensitivity overloads then every more sensitive one does too
+class SensitivitySearch:
+    def __init__ (self, low = 2, high = 10, verified = False):
+        self.low = low #Most sensitive setting known (or assumed) not to overload
+        self.high = high #Most sensitive setting that might not overload
+        self.verified = verified #True once low has been seen not to overload
+    
+    def done (self):
+        return self.low >= self.high
+    
+    #The next sensitivity to try, once done this is the answer
+    def probe (self):
+        if self.done():
+            return self.low
+        return (self.low + self.high + 1) // 2
+    
+    def update (self, probed, overload):
+        if overload:
+            self.high = probed - 1
+        else:
+            self.low = probed
+            self.verified = True
+
+#Finds the most sensitive AS and BS that dont overload, both channels are searched at the same time
+#If key has been seen before its sensitivities are tried first, and only a channel that overloads is searched again
+#key=None always does the full search
+#command is sent along with the first sensitivities, returns AS and BS
+def autorange (SA, key = None, command = ''):
+    steps = autorange_steps(key, command)
+    status_word = None
+    while True:
+        try:
+            message, wait = steps.send(status_word)
+        except StopIteration as result:
+            return result.value
+        if message:
+            SA.write(message)
+        status_word = wait_ready(SA, TIME_RECORD_COMPLETE, 0.25) if wait else None #waits to make sure an overload is caught if it will occur
+
+#The search done by autorange without any bus I/O, so autorange and AsyncSA.autorange search the same way
+#Yields (message, wait), message is written if it isnt empty and wait=True sends back the status word after the next time record
+#Returns AS and BS
+def autorange_steps (key = None, command = ''):
+    A = SensitivitySearch()
+    B = SensitivitySearch()
+    if key is not None and key in sensitivity_memory:
+        AS, BS = sensitivity_memory[key]
+        status_word = yield 'AS' + str(AS) + 'BS' + str(BS) + command, True
+        command = ''
+        if not status_word & (A_OVERLOAD | B_OVERLOAD): #Still good, this is the only check needed
+            return AS, BS
+        A = SensitivitySearch(2, AS - 1) if status_word & A_OVERLOAD else SensitivitySearch(AS, AS, True)
+        B = SensitivitySearch(2, BS - 1) if status_word & B_OVERLOAD else SensitivitySearch(BS, BS, True)
+    
+    #Each pass tries the middle of what is left for both channels, so it takes at most 4 passes instead of 9
+    written = None
+    while not (A.done() and B.done()):
+        AS, BS = A.probe(), B.probe()
+        status_word = yield 'AS' + str(AS) + 'BS' + str(BS) + command, True
+        command = ''
+        written = (AS, BS)
+        if not A.done():
+            A.update(AS, status_word & A_OVERLOAD)
+        if not B.done():
+            B.update(BS, status_word & B_OVERLOAD)
+    
+    #Sets the answer if the last pass overloaded, and checks 30 V since it is never tried by the search
+    #A new setting is always waited on, so the display is never read before a time record at the answer has finished
+    AS, BS = A.low, B.low
+    if written != (AS, BS) or not (A.verified and B.verified):
+        status_word = yield ('AS' + str(AS) + 'BS' + str(BS) + command if written != (AS, BS) else ''), True
+        if status_word & (A_OVERLOAD | B_OVERLOAD):
+            raise ValueError("Sensitivity went out of bounds")
+    
+    if key is not None:
+        sensitivity_memory[key] = (AS, BS)
+    return AS, BS
+
+#Reads the status word, LST1 leaves the bits set after reading them
+def read_status (SA):
+    SA.write('LST1')
+    return int.from_bytes(SA.read_bytes(1), 'big')
+
+#Waits until the SA is ready and returns the status word
+#In 'poll' mode the status word is cleared and then polled with a short backoff until every bit in mask is set
+#mask=0 reads the status word once, which only returns after the SA has dealt with every command sent before it
+#In 'sleep' mode it waits a fixed delay seconds instead, for when the status word cant be relied on
+#clear=False leaves the status word as it is, for when it was cleared before the command that starts what is waited for
+def wait_ready (SA, mask = SWEEP_COMPLETE, delay = 0.5, timeout = None, clear = True):
+    with timed('settle'):
+        if mask and clear:
+            SA.write('LST0') #reset status word
+        if settle_mode == 'sleep':
+            time.sleep(delay)
+            return read_status(SA) if mask else 0
+        
+        if timeout is None:
+            timeout = settle_timeout
+        end = time.perf_counter() + timeout
+        pause = 0.005
+        status_word = read_status(SA)
+        while status_word & mask != mask:
+            if time.perf_counter() > end:
+                raise TimeoutError("The SA did not set status bits " + str(mask) + " within " + str(timeout) + " seconds")
+            time.sleep(pause)
+            pause = min(pause * 2, 0.05)
+            status_word = read_status(SA)
+        return status_word
+
+#Takes one sweep in single sweep (RP0) by arming the SA, and waits for it, the display then holds it until the SA is armed again or put in RP1
+#Changing what is shown, SC, or AM only redraws a held sweep, so each of its traces can be read one after the other
+#ready is the status bit from start_averaging, so an average is held once it is complete, returns the status word
+#The status word is cleared before arming, a single sweep isnt repeated so clearing it after could lose the bit for good
+def hold_sweep (SA, ready = SWEEP_COMPLETE):
+    SA.write('RP0LST0')
+    SA.write('AR')
+    return wait_ready(SA, ready, 0.5, clear=False)
+
+#Writes a command and waits until the SA has taken it
+def send (SA, command, delay = 0.1):
+    SA.write(command)
+    wait_ready(SA, 0, delay)
+
+#Runs everything that talks to the SA on its own thread, so a GUI or script never waits on the bus
+#submit queues function(SA, *args) and returns a Future, requests are run one at a time in the order they were submitted
+#A callback is not called on the worker thread, it is held until deliver() is called from the thread that owns the GUI
+#error is called with the exception instead of callback if the request raises, a request with neither loses its exception
+#SA can be left as None and set later by a request that connects to it
+class InstrumentWorker:
+    def __init__ (self, SA = None):
+        self.SA = SA
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def submit (self, function, *args, callback = None, error = None):
+        future = concurrent.futures.Future()
+        self.requests.put((future, function, args, callback, error))
+        return future
+    
+    def run (self):
+        while True:
+            request = self.requests.get()
+            if request is None: #Sent by stop
+                return
+            future, function, args, callback, error = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(self.SA, *args))
+            except BaseException as exception:
+                future.set_exception(exception)
+            if callback is not None or error is not None:
+                self.results.put((callback, error, future))
+    
+    #Calls the callbacks of finished requests with their results
+    #An error from a request goes to its error function, or is raised here if it only has a callback
+    def deliver (self):
+        while not self.results.empty():
+            callback, error, future = self.results.get()
+            if error is not None and future.exception() is not None:
+                error(future.exception())
+            elif callback is not None:
+                callback(future.result())
+    
+    #Finishes what has already been submitted and then stops the thread
+    def stop (self):
+        self.requests.put(None)
+        self.thread.join()
+
+#Collects commands so they can be sent together in one write, like 'MD1AD0SP14'
+#A setting that is changed again before it is sent only keeps its newest value, so dragging a slider sends one AD
+#Commands without a value (RE, AR, TS, PRS, ...) are actions, a setting from before an action is never moved past it
+class CommandScheduler:
+    def __init__ (self):
+        self.pending = [] #[mnemonic, value] in the order they will be sent
+        self.lock = threading.Lock() #Commands can be added and flushed from different threads
+    
+    def add (self, command):
+        with self.lock:
+            for mnemonic, value in re.findall(r'(PRS|[A-Z]{2})([0-9.,]*)', command.upper()):
+                if mnemonic == 'PRS':
+                    self.pending = [[mnemonic, value]] #Anything still waiting would be undone by the preset anyway
+                elif value == '':
+                    if not (self.pending and self.pending[-1] == [mnemonic, value]): #The same action twice in a row is only sent once
+                        self.pending.append([mnemonic, value])
+                else:
+                    #Replaces the same setting if there is no action after it
+                    for x in reversed(self.pending):
+                        if x[1] == '':
+                            self.pending.append([mnemonic, value])
+                            break
+                        if x[0] == mnemonic:
+                            x[1] = value
+                            break
+                    else:
+                        self.pending.append([mnemonic, value])
+    
+    #Returns everything pending as one command string and empties the queue
+    def flush (self):
+        with self.lock:
+            command = ''.join(x[0] + x[1] for x in self.pending)
+            self.pending = []
+            return command
+
+#Keeps the last capacity traces in arrays that are made once, so adding a trace never allocates memory
+#Traces can be up to points long, each one is stored with the time it was added and the settings it was taken at
+class TraceRingBuffer:
+    def __init__ (self, capacity = 100, points = DISPLAY_WORDS):
+        self.capacity = capacity
+        self.traces = np.zeros((capacity, points))
+        self.sizes = np.zeros(capacity, dtype=int)
+        self.times = np.zeros(capacity)
+        self.settings = [None] * capacity
+        self.count = 0 #Number of traces ever added, the newest is in row (count - 1) % capacity
+        self.lock = threading.Lock() #Traces are usually added on a worker thread and read on the GUI thread
+    
+    def push (self, values, settings = None):
+        with self.lock:
+            row = self.count % self.capacity
+            self.traces[row, 0:values.size] = values
+            self.sizes[row] = values.size
+            self.times[row] = time.time()
+            self.settings[row] = settings
+            self.count += 1
+    
+    #Returns a copy of the newest trace and its settings
+    def latest (self):
+        with self.lock:
+            if self.count == 0:
+                raise IndexError("No traces have been added")
+            row = (self.count - 1) % self.capacity
+            return self.traces[row, 0:self.sizes[row]].copy(), self.settings[row]
+    
+    #Returns copies of the last n traces (oldest first) and their times, all n must be the same length
+    def last (self, n):
+        with self.lock:
+            n = min(n, self.count, self.capacity)
+            if n == 0:
+                return np.zeros((0, 0)), np.zeros(0)
+            rows = np.arange(self.count - n, self.count) % self.capacity
+            return self.traces[rows, 0:self.sizes[rows[-1]]], self.times[rows]
+
+#Keeps the last capacity traces for a waterfall in arrays that are made once, so it can run for hours without using more memory
+#Every trace is written twice, capacity rows apart, so the last capacity traces are always one slice in time order and never have to be put back in order
+#A trace with different settings or a different length than the last one starts the waterfall again, since the old ones wouldnt line up with it
+class WaterfallBuffer:
+    def __init__ (self, capacity = 1000, points = 256):
+        self.capacity = capacity
+        self.traces = np.zeros((2 * capacity, points), dtype=np.float32) #float32 halves the memory, the display only has 3 to 4 digits anyway
+        self.times = np.zeros(2 * capacity)
+        self.count = 0 #Number of traces added since the waterfall started
+        self.settings = None
+        self.lock = threading.Lock() #Traces are usually added on a worker thread and drawn on the GUI thread
+    
+    def push (self, values, settings = None):
+        with self.lock:
+            if values.size != self.traces.shape[1]:
+                self.traces = np.zeros((2 * self.capacity, values.size), dtype=np.float32)
+                self.count = 0
+            if settings != self.settings:
+                self.settings = settings
+                self.count = 0
+            row = self.count % self.capacity
+            now = time.time()
+            self.traces[row] = values
+            self.traces[row + self.capacity] = values
+            self.times[row] = now
+            self.times[row + self.capacity] = now
+            self.count += 1
+    
+    #Returns the traces (oldest first) and their times, with no more than rows of them so a long history fits the screen
+    #When there are more traces than rows each group of traces is shown by its highest point, so a short burst is never lost
+    #The times are of the newest trace in each group
+    def image (self, rows = None):
+        with self.lock:
+            n = min(self.count, self.capacity)
+            start = self.count % self.capacity if self.count >= self.capacity else 0
+            traces = self.traces[start:start + n]
+            times = self.times[start:start + n]
+            if rows is None or n <= rows:
+                return traces.copy(), times.copy()
+            step = -(-n // rows)
+            oldest = n % step #Left out so the newest trace is always in a full group
+            return traces[oldest:].reshape(-1, step, traces.shape[1]).max(axis=1), times[oldest + step - 1::step].copy()
+
+#Averages traces on the computer, so any number of them can be averaged without keeping them or restarting the SA's own averaging
+#Keeps a running linear mean, RMS, exponential average, peak hold, and variance (Welford's method) of every point
+#weight is how much each new trace counts in the exponential average, the first 1/weight traces are averaged linearly so it starts quickly
+#decibels=True is for a display in dBV (SC2 or SC3), each trace is changed to volts before it is added and the averages are changed back to dBV
+#The arrays are made once and every step works in place in them, so adding a trace takes the same time however many have been added
+class TraceAverager:
+    def __init__ (self, points = 256, weight = 0.1, decibels = False):
+        self.weight = weight
+        self.decibels = decibels
+        self.linear = np.zeros(points)
+        self.power = np.zeros(points) #Mean of the squares, for the RMS
+        self.exponential = np.zeros(points)
+        self.peak = np.zeros(points)
+        self.squares = np.zeros(points) #Sum of the squared differences from the mean, for the variance
+        self.values = np.zeros(points) #The trace in volts when decibels is True
+        self.delta = np.zeros(points) #Room to work in so add doesnt make new arrays
+        self.work = np.zeros(points)
+        self.count = 0
+        self.lock = threading.Lock() #Traces are usually added on a worker thread and read on another
+    
+    def add (self, values):
+        with self.lock:
+            if self.decibels:
+                np.divide(values, 20, out=self.values)
+                np.power(10, self.values, out=self.values)
+                values = self.values
+            self.count += 1
+            if self.count == 1:
+                self.peak[:] = values
+            else:
+                np.maximum(self.peak, values, out=self.peak)
+            
+            #Welford's method, the mean and squared differences are updated together so the variance doesnt lose precision
+            np.subtract(values, self.linear, out=self.delta)
+            np.divide(self.delta, self.count, out=self.work)
+            self.linear += self.work
+            np.subtract(values, self.linear, out=self.work)
+            self.work *= self.delta
+            self.squares += self.work
+            
+            np.multiply(values, values, out=self.delta)
+            self.delta -= self.power
+            self.delta /= self.count
+            self.power += self.delta
+            
+            np.subtract(values, self.exponential, out=self.delta)
+            self.delta *= max(self.weight, 1 / self.count)
+            self.exponential += self.delta
+    
+    #Starts the averages again without making new arrays
+    def reset (self):
+        with self.lock:
+            for x in (self.linear, self.power, self.exponential, self.peak, self.squares):
+                x.fill(0)
+            self.count = 0
+    
+    #Returns copies of the averages as they are now, it can be called while traces are still being added
+    #std is the standard deviation of each point between traces, and error is the standard error of the linear mean, for error bars
+    #With decibels the averages are in dBV, std and error are the dB one of them reaches above the linear mean, and variance stays in volts squared
+    def snapshot (self):
+        with self.lock:
+            variance = self.squares / (self.count - 1) if self.count > 1 else np.full(self.squares.shape, np.nan)
+            averages = {'linear': self.linear.copy(), 'rms': np.sqrt(self.power), 'exponential': self.exponential.copy(), 'peak': self.peak.copy(),
+                        'std': np.sqrt(variance), 'error': np.sqrt(variance / max(self.count, 1))}
+            if self.decibels:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    for name in ('std', 'error'):
+                        averages[name] = 20 * np.log10(1 + averages[name] / self.linear)
+                    for name in ('linear', 'rms', 'exponential', 'peak'):
+                        averages[name] = 20 * np.log10(averages[name])
+            return dict(averages, count=self.count, variance=variance)
+
+#Reads count new sweeps from the display and adds them to averager, which is made for the first trace if it is None
+#Waits for every sweep to finish so no trace is added twice, the SA's own averaging should be off (AV1) or it averages twice
+#decibels is passed to the TraceAverager it makes, it is True for the preset dBV display and should be False for SC1 or a phase display
+#A binary transfer needs key, which should hold the analyzer and every setting that changes the units of the display (SC, AM, AS, BS, and the traces shown)
+#Returns averager so it can be given back to carry on averaging
+def average_display (SA, count, averager = None, transfer = 'ascii', key = None, weight = 0.1, decibels = True):
+    if transfer == 'binary' and key is None:
+        raise ValueError("A binary transfer needs a key with the settings that change the units of the display")
+    for x in range(count):
+        wait_ready(SA, SWEEP_COMPLETE, 0.5)
+        values = read_display(SA, transfer, key)
+        if averager is None:
+            averager = TraceAverager(values.size, weight, decibels)
+        averager.add(values)
+    return averager
+
+#Noise bandwidth of each passband shape (PS1 Flattop, PS2 Hanning, PS3 Uniform) in display points, used by band_power
+NOISE_BANDWIDTH = {1: 3.77, 2: 1.5, 3: 1.0}
+
+#Returns the frequencies and heights of the points in peaks, moved to the top of a parabola through each point and its neighbours
+#This finds a peak that falls between two points to a fraction of a point, the frequencies have to be evenly spaced
+def interpolate_peaks (frequencies, values, peaks):
+    before, middle, after = values[peaks - 1], values[peaks], values[peaks + 1]
+    curve = before - 2 * middle + after
+    offset = np.divide(0.5 * (before - after), curve, out=np.zeros(peaks.size), where=curve != 0)
+    step = frequencies[1] - frequencies[0]
+    return frequencies[peaks] + offset * step, middle - 0.25 * (before - after) * offset
+
+#Returns the frequencies and heights of the count highest peaks of a trace, highest first
+#A peak is a point higher than the point before it and at least as high as the one after, threshold leaves out lower ones
+def find_peaks (frequencies, values, count = 5, threshold = None):
+    values = np.asarray(values, dtype=float)
+    middle = values[1:-1]
+    peaks = np.flatnonzero((middle > values[:-2]) & (middle >= values[2:])) + 1
+    if threshold is not None:
+        peaks = peaks[values[peaks] >= threshold]
+    peaks = peaks[np.argsort(values[peaks])[::-1][0:count]]
+    return interpolate_peaks(np.asarray(frequencies), values, peaks)
+
+#Finds the harmonics of fundamental (the highest peak if it isnt given) that are on the display, up to the count-th
+#Each harmonic is the highest point within tolerance points of where it should be, interpolated like find_peaks
+#Returns the harmonic numbers, frequencies, and heights, the first is the fundamental
+def find_harmonics (frequencies, values, fundamental = None, count = 5, tolerance = 2):
+    frequencies = np.asarray(frequencies)
+    values = np.asarray(values, dtype=float)
+    if fundamental is None:
+        peak = find_peaks(frequencies, values, 1)[0]
+        if peak.size == 0:
+            raise ValueError("The trace has no peaks")
+        fundamental = peak[0]
+    if fundamental <= 0:
+        raise ValueError("fundamental must be above 0 Hz")
+    orders = np.arange(1, count + 1)
+    orders = orders[(orders * fundamental >= frequencies[0]) & (orders * fundamental <= frequencies[-1])]
+    
+    #A window of points around where each harmonic should be, the highest point in each is the harmonic
+    step = frequencies[1] - frequencies[0]
+    centers = np.round((orders * fundamental - frequencies[0]) / step).astype(int)
+    windows = np.clip(centers[:, None] + np.arange(-tolerance, tolerance + 1), 1, values.size - 2)
+    peaks = windows[np.arange(orders.size), np.argmax(values[windows], axis=1)]
+    harmonic_frequencies, heights = interpolate_peaks(frequencies, values, peaks)
+    return orders, harmonic_frequencies, heights
+
+#The median of a trace, most of a spectrum is noise so this is close to the noise floor even with a few tones in it
+def noise_floor (values):
+    return float(np.nanmedian(values))
+
+#Adds up the power of a trace from low to high Hz, in dBV if dB is True or in V rms otherwise
+#passband is the PS setting, the points of a spectrum overlap by its noise bandwidth so that is taken out of the sum
+def band_power (frequencies, values, low = None, high = None, dB = True, passband = 1):
+    frequencies = np.asarray(frequencies)
+    values = np.asarray(values, dtype=float)
+    inside = np.ones(values.size, dtype=bool)
+    if low is not None:
+        inside &= frequencies >= low
+    if high is not None:
+        inside &= frequencies <= high
+    if dB:
+        power = np.sum(10 ** (values[inside] / 10)) / NOISE_BANDWIDTH[passband]
+        return float(10 * np.log10(power)) if power > 0 else -np.inf
+    return float(np.sqrt(np.sum(values[inside] ** 2) / NOISE_BANDWIDTH[passband]))
+
+#Runs all of the marker searches on one trace, for the panel's marker table or a script
+#Returns a dictionary with 'peaks' and 'harmonics' from find_peaks and find_harmonics, 'noise_floor', and 'power' over the whole trace
+#The harmonics are empty if the trace has no peaks
+def find_markers (frequencies, values, count = 5, harmonics = 5, dB = True, passband = 1):
+    peaks = find_peaks(frequencies, values, count)
+    if peaks[0].size and peaks[0][0] > 0:
+        harmonic_list = find_harmonics(frequencies, values, peaks[0][0], harmonics)
+    else:
+        harmonic_list = (np.zeros(0, dtype=int), np.zeros(0), np.zeros(0))
+    return {'peaks': peaks, 'harmonics': harmonic_list, 'noise_floor': noise_floor(values), 'power': band_power(frequencies, values, dB=dB, passband=passband)}
+
+#Reads the display memory with LFM as a packed block of 16 bit words, most significant byte first
+def read_display_words (SA, words = DISPLAY_WORDS):
+    SA.write('LFM' + DISPLAY_ADDRESS + ',' + str(words))
+    return np.frombuffer(SA.read_bytes(2 * words), dtype='>u2')
+
+#Converts raw display words into the same values LDS returns, all at once instead of point by point
+def decode_display_words (words, calibration):
+    stride = calibration['stride']
+    values = words[0:calibration['points'] * stride:stride] * calibration['scale'] + calibration['offset']
+    log = calibration['log']
+    values[log] = 10 ** values[log]
+    return values
+
+#Fits LDS values to display words on a linear and a log scale, returns (scale, offset, log, error) of the better one
+def fit_display_words (x_vals, y_vals):
+    best = None
+    for log in (False, True):
+        if log and np.any(y_vals <= 0):
+            continue
+        fit_vals = np.log10(y_vals) if log else y_vals
+        if np.ptp(x_vals) == 0:
+            scale, offset = 0.0, np.mean(fit_vals)
+        else:
+            scale, offset = np.polyfit(x_vals, fit_vals, 1)
+        error = np.max(np.abs(x_vals * scale + offset - fit_vals)) / max(np.ptp(fit_vals), 1e-12)
+        if best is None or error < best[3]:
+            best = (scale, offset, log, error)
+    return best
+
+#Finds the scale/offset between the display memory and LDS by reading the same display both ways
+#The display is held with hold_sweep while it is read so it cant change between the reads however fast the SA sweeps, then the SA is put back in RP1
+#held=True is for a display that is already held, it is read as it is and left held, ready is the status bit from start_averaging
+#Each half is also fit on its own, since the two traces of a dual display can have different units
+def calibrate_binary_transfer (SA, held = False, ready = SWEEP_COMPLETE):
+    try:
+        if not held:
+            hold_sweep(SA, ready)
+        words = read_display_words(SA)
+        ascii_values = SA.query_ascii_values('LDS', container=np.array)
+        if not np.array_equal(words, read_display_words(SA)):
+            raise ValueError("The display changed while it was held, use transfer='ascii'")
+    finally:
+        if not held:
+            SA.write('RP1')
+    words = words.astype(float)
+    
+    #Tries every layout the points could have in memory, as one trace or two halves, and keeps the best fit
+    points = ascii_values.size
+    calibration = None
+    for stride in {1, DISPLAY_WORDS // points}:
+        x_vals = words[0:points * stride:stride]
+        if x_vals.size != points:
+            continue
+        for halves in (1, 2):
+            fits = [fit_display_words(x, y) for x, y in zip(np.array_split(x_vals, halves), np.array_split(ascii_values, halves))]
+            error = max(fit[3] for fit in fits)
+            if calibration is None or error < calibration['error']:
+                sizes = [x.size for x in np.array_split(x_vals, halves)]
+                calibration = {'points': points, 'stride': stride, 'error': error,
+                               'scale': np.repeat([fit[0] for fit in fits], sizes),
+                               'offset': np.repeat([fit[1] for fit in fits], sizes),
+                               'log': np.repeat([fit[2] for fit in fits], sizes)}
+    
+    if calibration is None or calibration['error'] > 0.01:
+        raise ValueError("The display memory does not match LDS, use transfer='ascii'")
+    return calibration, ascii_values
+
+#Reads the display, transfer='ascii' uses LDS and transfer='binary' uses the display memory
+#The first binary read for each key calibrates the transfer, so it returns the ASCII values from that calibration
+#held=True is for a display that hold_sweep is holding, so the calibration reads it without taking a sweep of its own
+#ready is the status bit from start_averaging, so a calibration sweep is held once its average is complete
+def read_display (SA, transfer = 'ascii', key = None, held = False, ready = SWEEP_COMPLETE):
+    if transfer == 'ascii':
+        with timed('transfer'):
+            SA.write('LDS')
+            raw = SA.read_raw()
+        with timed('parse'):
+            return pyvisa.util.from_ascii_block(raw.decode('ascii'), container=np.array)
+    if key not in binary_calibrations:
+        with timed('calibrate'):
+            binary_calibrations[key], values = calibrate_binary_transfer(SA, held, ready)
+        return values
+    calibration = binary_calibrations[key]
+    with timed('transfer'):
+        words = read_display_words(SA, calibration['points'] * calibration['stride'])
+    with timed('parse'):
+        return decode_display_words(words, calibration)
+
+#Times the ASCII and binary transfers side by side, the bus time and parse time are measured separately
+def compare_transfer_modes (SA, repeats = 5, key = None):
+    if key not in binary_calibrations:
+        binary_calibrations[key] = calibrate_binary_transfer(SA)[0]
+    calibration = binary_calibrations[key]
+    words = calibration['points'] * calibration['stride']
+    
+    results = {'ascii': {'bytes': 0, 'transfer': 0.0, 'parse': 0.0}, 'binary': {'bytes': 2 * words, 'transfer': 0.0, 'parse': 0.0}}
+    for x in range(repeats):
+        start = time.perf_counter()
+        SA.write('LDS')
+        raw = SA.read_raw()
+        middle = time.perf_counter()
+        ascii_values = pyvisa.util.from_ascii_block(raw.decode('ascii'), container=np.array)
+        end = time.perf_counter()
+        results['ascii']['bytes'] = len(raw)
+        results['ascii']['transfer'] += (middle - start) / repeats
+        results['ascii']['parse'] += (end - middle) / repeats
+        
+        start = time.perf_counter()
+        raw_words = read_display_words(SA, words)
+        middle = time.perf_counter()
+        binary_values = decode_display_words(raw_words, calibration)
+        end = time.perf_counter()
+        results['binary']['transfer'] += (middle - start) / repeats
+        results['binary']['parse'] += (end - middle) / repeats
+    results['max_difference'] = float(np.max(np.abs(binary_values - ascii_values)))
+    
+    print('Mode    Bytes   Transfer (ms)   Parse (ms)')
+    for mode in ('ascii', 'binary'):
+        print('%-7s %-7d %-15.2f %.3f' % (mode, results[mode]['bytes'], results[mode]['transfer'] * 1000, results[mode]['parse'] * 1000))
+    return results
+
+#Capture files hold any number of captures one after another, so a new capture is just added to the end
+#Each capture is:
+#   4 bytes    b'SACP'
+#   4 bytes    length of the header in bytes, little endian unsigned
+#   header     JSON in UTF-8, with 'names' (one per column), 'points', 'dtype' ('<f8', or '<c16' for complex columns),
+#              'timestamp' (ISO 8601), and 'settings' (whatever the SA was set to)
+#   columns    every column one after the other, points values each, in dtype
+CAPTURE_MAGIC = b'SACP'
+
+#Adds a capture to the end of file_name, making it if it doesnt exist
+#columns is a list of equal length arrays called names, the first is normally the frequency
+def append_capture (file_name, columns, names, settings = None, timestamp = None):
+    columns = np.asarray(columns)
+    dtype = '<c16' if np.iscomplexobj(columns) else '<f8'
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc).astimezone()
+    header = {'names': list(names), 'points': int(columns.shape[1]), 'dtype': dtype, 'timestamp': timestamp.isoformat(), 'settings': settings or {}}
+    header = json.dumps(header, default=str).encode('utf-8')
+    with open(file_name, 'ab') as file:
+        file.write(CAPTURE_MAGIC + struct.pack('<I', len(header)) + header)
+        file.write(columns.astype(dtype).tobytes())
+
+#Adds an Acquisition from acquire or zoom_sweep to a capture file, csv_name also saves it as a csv
+def save_acquisition (acquisition, file_name, csv_name = None):
+    columns = [acquisition.frequencies] + list(acquisition.values)
+    names = ['Frequency (Hz)'] + list(acquisition.names)
+    append_capture(file_name, columns, names, acquisition.settings, acquisition.timestamp)
+    if csv_name is not None:
+        np.savetxt(csv_name, np.transpose(columns), header=','.join(names), delimiter=',', comments='')
+
+#Returns every capture in a capture file as a list of (header, columns), columns has a row for each name in the header
+#The columns are read straight from the file bytes, only the short headers are parsed
+def read_captures (file_name):
+    data = Path(file_name).read_bytes()
+    captures = []
+    offset = 0
+    while offset < len(data):
+        if data[offset:offset + 4] != CAPTURE_MAGIC:
+            raise ValueError(str(file_name) + " is not a capture file, or is damaged at byte " + str(offset))
+        size = struct.unpack_from('<I', data, offset + 4)[0]
+        header = json.loads(data[offset + 8:offset + 8 + size].decode('utf-8'))
+        offset += 8 + size
+        count = len(header['names']) * header['points']
+        columns = np.frombuffer(data, dtype=header['dtype'], count=count, offset=offset).reshape(len(header['names']), header['points'])
+        offset += columns.nbytes
+        captures.append((header, columns))
+    return captures
+
+#Returns the column called name from every capture in a capture file that has it, as a 2D array with a row per capture
+#The captures have to be the same length, also returns their headers
+def stack_captures (file_name, name):
+    captures = [x for x in read_captures(file_name) if name in x[0]['names']]
+    if len({x[0]['points'] for x in captures}) > 1:
+        raise ValueError("The captures with " + name + " are not all the same length")
+    headers = [x[0] for x in captures]
+    return np.array([x[1][x[0]['names'].index(name)] for x in captures]), headers
+
+#Returns a datetime or POSIX time as POSIX seconds
+def posix_time (value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+#Stores traces on disk for monitoring over a long time, like a night of traces taken with acquire
+#The folder has traces.f8, every trace as a fixed record of points float64 values (shorter traces are padded with NaN),
+#and index.bin, an INDEX_DTYPE record for each trace in the same order. Both are only ever added to the end of,
+#so the index is in time order, and both are memory mapped when read so only the parts that are used are loaded
+class TraceArchive:
+    INDEX_DTYPE = np.dtype([('time', '<f8'), ('channel', 'S12'), ('IM', 'S8'), ('PHAS', 'u1'), ('MD', 'u1'), ('AD', '<f4'), ('SP', 'u1'),
+                            ('AS', 'u1'), ('BS', 'u1'), ('points', '<u2'), ('start', '<f8'), ('stop', '<f8')])
+    
+    def __init__ (self, folder, points = 256):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.points = points
+        self.index_path = self.folder / 'index.bin'
+        self.traces_path = self.folder / 'traces.f8'
+        self.lock = threading.Lock()
+        self.mapped = (-1, None, None) #count, index, traces of the last memory map
+        for path in (self.index_path, self.traces_path):
+            path.touch()
+        
+        #A trace written without its index entry (the program stopped between them) is cut off so the two stay lined up
+        record_bytes = self.points * 8
+        if self.traces_path.stat().st_size > len(self) * record_bytes:
+            os.truncate(self.traces_path, len(self) * record_bytes)
+        if self.traces_path.stat().st_size != len(self) * record_bytes:
+            raise ValueError(str(self.folder) + " doesnt have traces of " + str(points) + " points, or its index is damaged")
+        self.last_time = float(self.index()['time'][-1]) if len(self) else -np.inf
+    
+    def __len__ (self):
+        return self.index_path.stat().st_size // self.INDEX_DTYPE.itemsize
+    
+    #Adds every y array of an Acquisition as its own trace, named by the channel it came from
+    #A complex y array (from transfer_function) is added as two traces, its magnitude as 'name mag' and its phase in degrees as 'name phase'
+    def add (self, acquisition):
+        for values, name in zip(acquisition.values, acquisition.names):
+            if np.iscomplexobj(values):
+                parts = [(np.abs(values), name + ' mag'), (np.degrees(np.angle(values)), name + ' phase')]
+            else:
+                parts = [(values, name)]
+            for part, channel in parts:
+                self.add_trace(part, acquisition.timestamp, channel, acquisition.settings, acquisition.frequencies[0], acquisition.frequencies[-1])
+    
+    #Adds one trace, settings can have IM, PHAS, MD, AD, SP, AS, and BS, start and stop are its first and last frequency
+    #Traces have to be added in time order, and have to be real since the traces are float64
+    def add_trace (self, values, timestamp, channel, settings, start, stop):
+        if np.iscomplexobj(values):
+            raise ValueError("The archive only holds real traces, add the magnitude and phase as their own traces (add does this for an Acquisition)")
+        if len(channel.encode()) > self.INDEX_DTYPE['channel'].itemsize:
+            raise ValueError("The channel name " + channel + " is longer than " + str(self.INDEX_DTYPE['channel'].itemsize) + " bytes")
+        values = np.asarray(values, dtype='<f8')
+        if values.size > self.points:
+            raise ValueError("A trace of " + str(values.size) + " points doesnt fit in an archive of " + str(self.points) + " points")
+        record = np.full(self.points, np.nan, dtype='<f8')
+        record[0:values.size] = values
+        entry = np.zeros(1, dtype=self.INDEX_DTYPE)
+        entry['time'] = posix_time(timestamp)
+        entry['channel'] = channel.encode()
+        for name in ('IM', 'PHAS', 'MD', 'AD', 'SP', 'AS', 'BS'):
+            if name in settings:
+                entry[name] = settings[name].encode() if name == 'IM' else settings[name]
+        entry['points'] = values.size
+        entry['start'] = start
+        entry['stop'] = stop
+        with self.lock:
+            if entry['time'][0] < self.last_time:
+                raise ValueError("Traces have to be added in time order")
+            self.last_time = float(entry['time'][0])
+            with open(self.traces_path, 'ab') as file:
+                file.write(record.tobytes())
+            with open(self.index_path, 'ab') as file: #Written last, a trace only counts once its index entry is there
+                file.write(entry.tobytes())
+    
+    #Memory maps the files again if traces were added since the last time
+    def remap (self):
+        count = len(self)
+        with self.lock:
+            if self.mapped[0] != count:
+                if count == 0:
+                    self.mapped = (0, np.zeros(0, dtype=self.INDEX_DTYPE), np.zeros((0, self.points)))
+                else:
+                    self.mapped = (count, np.memmap(self.index_path, dtype=self.INDEX_DTYPE, mode='r', shape=(count,)),
+                                   np.memmap(self.traces_path, dtype='<f8', mode='r', shape=(count, self.points)))
+            return self.mapped
+    
+    #Returns the index, a read only array of INDEX_DTYPE with an entry for each trace
+    def index (self):
+        return self.remap()[1]
+    
+    #Returns every trace as a read only (traces, points) array, slicing it doesnt copy anything
+    def traces (self):
+        return self.remap()[2]
+    
+    #Returns the numbers of the traces taken from start up to stop (datetimes or POSIX times, None for no limit)
+    #that match every setting given, like find(start, stop, channel='B', SP=14)
+    #start and stop are found with a binary search of the times, so only the index entries between them are looked at
+    def find (self, start = None, stop = None, **settings):
+        index = self.index()
+        low = 0 if start is None else int(np.searchsorted(index['time'], posix_time(start), 'left'))
+        high = len(index) if stop is None else int(np.searchsorted(index['time'], posix_time(stop), 'left'))
+        entries = index[low:high]
+        match = np.ones(entries.size, dtype=bool)
+        for name, value in settings.items():
+            if name not in self.INDEX_DTYPE.names:
+                raise ValueError(name + " is not in the index, it has " + ', '.join(self.INDEX_DTYPE.names))
+            match &= entries[name] == (value.encode() if isinstance(value, str) else value)
+        return low + np.flatnonzero(match)
+    
+    #Returns the traces numbered in numbers as a (traces, points) array, and their frequency arrays
+    def read (self, numbers):
+        index = np.atleast_1d(self.index()[numbers])
+        steps = (index['stop'] - index['start']) / np.maximum(index['points'].astype(float) - 1, 1)
+        frequencies = index['start'][:, None] + steps[:, None] * np.arange(self.points)
+        frequencies[np.arange(self.points) >= index['points'][:, None]] = np.nan
+        if np.ndim(numbers) == 0:
+            frequencies = frequencies[0]
+        return self.traces()[numbers], frequencies
+
+#The results of AnalyzerGroup.acquire, acquisitions has an Acquisition for each analyzer by its resource name
+#timestamp is when the acquisitions were started, which is the same moment for every bus when they were synchronized
+class GroupAcquisition:
+    def __init__ (self, acquisitions, timestamp):
+        self.acquisitions = acquisitions
+        self.timestamp = timestamp
+    
+    #Returns how many seconds after timestamp each analyzer's display was read
+    def offsets (self):
+        return {x: (self.acquisitions[x].timestamp - self.timestamp).total_seconds() for x in self.acquisitions}
+    
+    #Returns the y array called name from every analyzer that has it as a 2D array with a row per analyzer, and their resource names
+    #The analyzers have to have been set to the same number of points
+    def stack (self, name):
+        analyzers = [x for x in self.acquisitions if name in self.acquisitions[x].names]
+        values = [self.acquisitions[x].values[self.acquisitions[x].names.index(name)] for x in analyzers]
+        if len({x.size for x in values}) > 1:
+            raise ValueError("The analyzers with " + name + " do not have the same number of points")
+        return np.array(values), analyzers
+    
+    #Adds every analyzer's acquisition to a capture file, its settings have the analyzer and the time of the group
+    def save (self, file_name):
+        for x, acquisition in self.acquisitions.items():
+            columns = [acquisition.frequencies] + list(acquisition.values)
+            names = ['Frequency (Hz)'] + list(acquisition.names)
+            settings = dict(acquisition.settings, analyzer=x, group_timestamp=self.timestamp.isoformat())
+            append_capture(file_name, columns, names, settings, acquisition.timestamp)
+
+#Runs several analyzers at the same time, with an SASession for each and an InstrumentWorker for each GPIB bus
+#Requests to analyzers on the same bus are run one at a time since only one can talk on a bus, different buses run in parallel
+#resource_names=None uses every GPIB instrument the resource manager finds, the rest of the arguments are like SASession
+#Can be used with open/close or as a context manager, with AnalyzerGroup() as group:
+class AnalyzerGroup:
+    def __init__ (self, resource_names = None, rm = None, simulate = False, **options):
+        self.resource_names = None if resource_names is None else list(resource_names)
+        self.rm = rm
+        self.own_rm = rm is None #Only closes the resource manager if it made it
+        self.simulate = simulate
+        self.options = options
+        self.sessions = {}
+        self.workers = {}
+    
+    #Opens every analyzer, each bus opens its own at the same time
+    def open (self):
+        if self.sessions:
+            return self
+        if self.rm is None:
+            self.rm = open_resource_manager(self.simulate, **self.options)
+        if self.resource_names is None:
+            self.resource_names = find_analyzers(self.rm)
+        for x in self.resource_names:
+            self.sessions[x] = SASession(x, rm=self.rm)
+            if bus_name(x) not in self.workers:
+                self.workers[bus_name(x)] = InstrumentWorker()
+        for future in [self.submit(x, SASession.open) for x in self.sessions]:
+            future.result()
+        return self
+    
+    def close (self):
+        for worker in self.workers.values():
+            worker.stop()
+        for session in self.sessions.values():
+            session.close()
+        self.workers = {}
+        self.sessions = {}
+        if self.own_rm and self.rm is not None:
+            self.rm.close()
+            self.rm = None
+    
+    def __enter__ (self):
+        return self.open()
+    
+    def __exit__ (self, *args):
+        self.close()
+    
+    #Queues function(session, *args, **kwargs) on the worker of the bus the analyzer called name is on, returns a Future
+    def submit (self, name, function, *args, **kwargs):
+        session = self.sessions[name]
+        return self.workers[bus_name(name)].submit(lambda SA: function(session, *args, **kwargs))
+    
+    #Runs acquire on every analyzer and returns a GroupAcquisition, so it takes about as long as the slowest bus
+    #common has the acquire arguments for every analyzer, settings can have different ones for an analyzer by its resource name
+    #synchronized=True holds every bus until all of them have finished what they were doing, so their acquisitions start together
+    #synchronized=False starts each bus as soon as it is free
+    def acquire (self, settings = None, synchronized = True, **common):
+        settings = settings or {}
+        start = {'time': datetime.now(timezone.utc).astimezone()}
+        if synchronized and len(self.workers) > 1:
+            def started ():
+                start['time'] = datetime.now(timezone.utc).astimezone()
+            barrier = threading.Barrier(len(self.workers), action=started)
+            for worker in self.workers.values():
+                worker.submit(lambda SA: barrier.wait(settle_timeout))
+        futures = {x: self.submit(x, lambda session, options: acquire(session=session, **options), dict(common, **settings.get(x, {})))
+                   for x in self.sessions}
+        acquisitions = {x: futures[x].result() for x in futures}
+        return GroupAcquisition(acquisitions, start['time'])
+
+#Does what the functions above do from asyncio code, without blocking the event loop
+#Everything that uses the bus is run on an InstrumentWorker, including the waits between status reads, so the event loop is never blocked
+#lock is held for each operation, so a search or trace read from one task is never split up by commands from another
+#session is an SASession, or one is made from the SASession arguments. Use it with async with AsyncSA() as SA: or await open/close
+class AsyncSA:
+    def __init__ (self, session = None, **kwargs):
+        self.session = SASession(**kwargs) if session is None else session
+        self.worker = InstrumentWorker(self.session.SA)
+        self.lock = asyncio.Lock()
+    
+    async def open (self):
+        async with self.lock:
+            await self.call(lambda SA: self.session.open())
+            self.worker.SA = self.session.SA
+        return self
+    
+    async def close (self):
+        async with self.lock:
+            await self.call(lambda SA: self.session.close())
+            self.worker.SA = None
+    
+    async def __aenter__ (self):
+        return await self.open()
+    
+    async def __aexit__ (self, *args):
+        await self.close()
+        await asyncio.get_running_loop().run_in_executor(None, self.worker.stop)
+    
+    #Runs function(SA, *args) on the worker and waits for it, without taking the lock
+    async def call (self, function, *args):
+        return await asyncio.wrap_future(self.worker.submit(function, *args))
+    
+    #Runs wait_ready on the worker, without taking the lock, the event loop keeps running while it polls
+    async def settle (self, mask = SWEEP_COMPLETE, delay = 0.5, timeout = None, clear = True):
+        return await self.call(wait_ready, mask, delay, timeout, clear)
+    
+    async def write (self, command):
+        async with self.lock:
+            await self.call(lambda SA: SA.write(command))
+    
+    async def query (self, command):
+        async with self.lock:
+            return await self.call(lambda SA: SA.query(command))
+    
+    async def read_status (self):
+        async with self.lock:
+            return await self.call(read_status)
+    
+    async def read_alphanumerics (self):
+        async with self.lock:
+            return await self.call(lambda SA: SA.query('LAN'))
+    
+    async def wait_ready (self, mask = SWEEP_COMPLETE, delay = 0.5, timeout = None):
+        async with self.lock:
+            return await self.settle(mask, delay, timeout)
+    
+    async def configure (self, MD = 1, AD = 0, SP = 14, IM = 'bodefull', PHAS = 0):
+        async with self.lock:
+            await self.call(lambda SA: configure(self.session, MD, AD, SP, IM, PHAS))
+    
+    #Like set_sensitivity, returns AS and BS
+    async def autorange (self, key = None, command = 'IM2'):
+        async with self.lock:
+            steps = autorange_steps(key, command)
+            status_word = None
+            while True:
+                try:
+                    message, wait = steps.send(status_word)
+                except StopIteration as result:
+                    return result.value
+                if message:
+                    await self.call(lambda SA: SA.write(message))
+                status_word = await self.settle(TIME_RECORD_COMPLETE, 0.25) if wait else None
+    
+    #Reads the display like read_display
+    async def read_display (self, transfer = 'ascii', key = None):
+        async with self.lock:
+            return await self.call(read_display, transfer, key)
+    
+    #Runs all of acquire on the worker and returns its Acquisition, the event loop keeps running while it does
+    async def acquire (self, **kwargs):
+        async with self.lock:
+            return await self.call(lambda SA: acquire(session=self.session, **kwargs))
+
+#Step types a recipe can have, and the keys of a step that arent arguments for its measurement
+RECIPE_MEASUREMENTS = ('acquire', 'average', 'transfer_function', 'zoom_sweep')
+RECIPE_KEYS = ('type', 'name', 'markers', 'export', 'csv')
+
+#Settings a settings step cant change, they are arguments of the measurement steps or are found by autorange
+MEASUREMENT_SETTINGS = ('MD', 'AD', 'SP', 'IM', 'AS', 'BS')
+
+#Returns the function each measurement step type runs
+def recipe_functions ():
+    return {'acquire': acquire, 'average': average_acquisitions, 'transfer_function': transfer_function, 'zoom_sweep': zoom_sweep}
+
+#Checks the arguments of step x against the function it runs, so a misspelled or missing argument stops the recipe before anything is measured
+#session and settings are given by run_recipe, and the arguments average_acquisitions doesnt have itself are passed on to acquire
+def check_step_arguments (x, step_type, arguments):
+    function = recipe_functions()[step_type]
+    try:
+        inspect.signature(function).bind(session=None, settings=None, **arguments)
+        if function is average_acquisitions:
+            own = inspect.signature(average_acquisitions).parameters
+            inspect.signature(acquire).bind(**{k: v for k, v in arguments.items() if k not in own})
+    except TypeError as error:
+        raise ValueError("Step " + str(x) + " has arguments " + step_type + " cant take: " + str(error))
+
+#Reads a recipe from a JSON file, see run_recipe for what is in it
+def load_recipe (file_name):
+    with open(file_name) as file:
+        return json.load(file)
+
+#Turns a recipe into the list of measurements to run, each with every setting it is measured with
+#Settings steps are merged into the measurements after them instead of being sent on their own, since each measurement sets the SA up anyway
+#With reorder=True (the default) the measurements are put in order of their settings, so ones that are set up the same way run one after the other
+#The settings are compared by their repr, since a recipe can give the same mnemonic as a number in one step and a string in another
+#Every measurement's arguments are checked here, so a mistake anywhere in the recipe is found before the SA is touched
+def plan_recipe (recipe):
+    settings = {}
+    planned = []
+    for x, step in enumerate(recipe['steps']):
+        step_type = step.get('type')
+        if step_type == 'settings':
+            for mnemonic in step:
+                if mnemonic == 'type':
+                    continue
+                if mnemonic not in PRESET_STATE or mnemonic in MEASUREMENT_SETTINGS:
+                    raise ValueError("Step " + str(x) + " cant set " + mnemonic + ", only front panel settings other than " + ', '.join(MEASUREMENT_SETTINGS) + " can be in a settings step")
+            settings = dict(settings, **{k: v for k, v in step.items() if k != 'type'})
+            continue
+        if step_type not in RECIPE_MEASUREMENTS:
+            raise ValueError("Step " + str(x) + " has type " + str(step_type) + ", it must be 'settings' or one of " + ', '.join(RECIPE_MEASUREMENTS))
+        arguments = dict(recipe.get('defaults', {}))
+        arguments.update({k: v for k, v in step.items() if k not in RECIPE_KEYS})
+        check_step_arguments(x, step_type, arguments)
+        planned.append({'index': x, 'name': step.get('name', step_type + ' ' + str(x)), 'type': step_type, 'arguments': arguments, 'settings': dict(settings),
+                        'markers': step.get('markers', False), 'export': step.get('export', recipe.get('output')), 'csv': step.get('csv')})
+    if recipe.get('reorder', True):
+        planned.sort(key=lambda step: (sorted((k, repr(v)) for k, v in step['settings'].items()), step['arguments'].get('MD', 1), step['arguments'].get('SP', 14),
+                                       step['arguments'].get('AD', 0), step['type'], str(step['arguments'].get('IM', ''))))
+    return planned
+
+#Runs acquire count times and averages every y array with a TraceAverager, returns an Acquisition of the averages
+#mode is 'linear', 'rms', 'exponential', or 'peak', the standard deviation of each y array is added after it
+#A magnitude in dBV (SC2 or SC3, the preset) is averaged in volts and given back in dBV, a B/A of two dB traces isnt dB so it needs SC1
+def average_acquisitions (count = 16, mode = 'linear', weight = 0.1, session = None, settings = None, **arguments):
+    if mode not in {'linear', 'rms', 'exponential', 'peak'}:
+        raise ValueError("mode must be 'linear' 'rms' 'exponential' or 'peak'")
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    decibels = int(dict(PRESET_STATE, **(settings or {}))['SC']) != 1 and arguments.get('PHAS', 0) == 0
+    if decibels and str(arguments.get('IM', 'bodefull')).lower() in {'bodefull', 'bodehalf'} and mode != 'peak':
+        raise ValueError("B/A of a dB display cant be averaged, set SC to 1")
+    averagers = None
+    for x in range(count):
+        acquisition = acquire(session=session, settings=settings, **arguments)
+        if averagers is None:
+            averagers = [TraceAverager(y.size, weight, decibels) for y in acquisition.values]
+        for averager, y in zip(averagers, acquisition.values):
+            averager.add(y)
+    snapshots = [x.snapshot() for x in averagers]
+    values = [y for x in snapshots for y in (x[mode], x['std'])]
+    names = [y for x in acquisition.names for y in (x, x + ' std')]
+    return Acquisition(acquisition.frequencies, values, names, dict(acquisition.settings, count=count, mode=mode))
+
+#Does the part of a step that doesnt use the bus, on run_recipe's processing thread: finds markers and adds the result to its files
+#Returns the step's report
+def process_step (step, acquisition, report):
+    start = time.perf_counter()
+    if step['markers']:
+        report['markers'] = {}
+        for name, values in zip(acquisition.names, acquisition.values):
+            if not np.iscomplexobj(values):
+                markers = find_markers(acquisition.frequencies, values, passband=int(step['settings'].get('PS', 1)))
+                report['markers'][name] = {'peaks': np.transpose(markers['peaks']).tolist(), 'noise_floor': markers['noise_floor'], 'power': markers['power']}
+    if step['export'] is not None or step['csv'] is not None:
+        columns = [acquisition.frequencies] + list(acquisition.values)
+        names = ['Frequency (Hz)'] + list(acquisition.names)
+        if step['export'] is not None:
+            append_capture(step['export'], columns, names, dict(acquisition.settings, step=step['name']), acquisition.timestamp)
+        if step['csv'] is not None:
+            np.savetxt(step['csv'], np.transpose(columns), header=','.join(names), delimiter=',', comments='')
+    report['process'] = time.perf_counter() - start
+    return report
+
+#Runs a recipe, a dictionary (or JSON file) with a list of steps that is run without anyone at the SA:
+#    {"output": "SA_data/test.sacap", "defaults": {"transfer": "ascii"}, "reorder": true, "steps": [
+#        {"type": "settings", "AC": 2, "PS": 3},
+#        {"type": "acquire", "name": "A 5kHz", "MD": 2, "SP": 12, "IM": "a", "markers": true},
+#        {"type": "average", "name": "B averaged", "MD": 2, "SP": 12, "IM": "b", "count": 32, "mode": "rms"},
+#        {"type": "transfer_function", "name": "Bode", "MD": 2, "SP": 12, "csv": "SA_data/bode.csv"}]}
+#A settings step has front panel mnemonics that every measurement after it is set up with, see plan_recipe
+#A measurement step has the arguments of acquire, average_acquisitions, transfer_function, or zoom_sweep, and defaults has arguments for every one
+#markers=true finds the markers of the result, export (or output) is the capture file it is added to, and csv saves it as a csv
+#The markers and files of a step are done on another thread while the next step is using the bus
+#Returns a report for every step with how long it spent on the bus and processing, and the total time
+def run_recipe (recipe, session = None):
+    if not isinstance(recipe, dict):
+        recipe = load_recipe(recipe)
+    steps = plan_recipe(recipe)
+    if session is None:
+        session = get_session()
+    measurements = recipe_functions()
+    
+    start = time.perf_counter()
+    pending = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as processing: #One thread, so the files are written in the order the steps ran
+        for step in steps:
+            step_start = time.perf_counter()
+            acquisition = measurements[step['type']](session=session, settings=step['settings'] or None, **step['arguments'])
+            report = {'name': step['name'], 'type': step['type'], 'step': step['index'], 'start': step_start - start, 'bus': time.perf_counter() - step_start}
+            pending.append(processing.submit(process_step, step, acquisition, report))
+        reports = [x.result() for x in pending]
+    return {'total': time.perf_counter() - start, 'steps': reports}
+
+#Prints the report of run_recipe as a table in ms
+def print_recipe_report (report):
+    print(f"{'step':<28}{'type':<20}{'bus ms':>10}{'process ms':>12}")
+    for x in report['steps']:
+        print(f"{x['name']:<28}{x['type']:<20}{x['bus'] * 1000:>10.1f}{x['process'] * 1000:>12.1f}")
+    print(f"{'total':<48}{report['total'] * 1000:>10.1f}")
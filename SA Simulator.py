@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:02:11 2026
+
+@author: Jack Cochrane
+
+A simulated HP 3582A that can be used instead of the pyvisa resource, so the plotter and control panel can be
+developed, tested, and timed without an analyzer on the bus. It understands the commands used by Imports - Setup.py
+and the Virtual SA Control Panel, makes spectra from a list of tones and a noise floor, and waits like a real bus would.
+
+Use it with SASession(simulate=True), or make a SimulatedResourceManager and give it to SASession as rm
+"""
+
+import numpy as np
+import re
+import time
+
+#From Table A-1 in the attached PDF, index 0 is setting 1
+SENSITIVITY_VOLTS = [30, 30, 10, 3, 1, 0.3, 0.1, 0.03, 0.01, 0.003] #CAL is treated as 30 V
+SENSITIVITY_DBV = [30, 30, 20, 10, 0, -10, -20, -30, -40, -50]
+SPAN_HZ = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000]
+PASSBAND_BINS = {1: 3.8, 2: 1.5, 3: 1.0} #Width of a tone in bins for Flattop, Hanning, and Uniform
+AVERAGE_COUNTS = {1: 4, 2: 8, 3: 16, 4: 32}
+
+#State after PRS, from Table A-2 in the attached PDF
+PRESET = {'IM': 1, 'AC': 1, 'BC': 1, 'AS': 2, 'BS': 2, 'SL': 1, 'FR': 1, 'RP': 1, 'MD': 1, 'AD': 0, 'SP': 14,
+          'MN': 0, 'MR': 0, 'MB': 0, 'MT': 0, 'MP': 0, 'AA': 1, 'AB': 0, 'AX': 0, 'PA': 0, 'PB': 0, 'PX': 0,
+          'TA': 0, 'TB': 0, 'CH': 0, 'SC': 2, 'AM': 1, 'PS': 1, 'AV': 1, 'NU': 1, 'SH': 0, 'TR': 0, 'RR': 0}
+
+#Traces in the order they are put on the display, and the input modes they can be shown in
+DISPLAY_ORDER = [('AA', {1, 2}), ('PA', {1, 2}), ('AB', {2, 3}), ('PB', {2, 3}), ('AX', {2}), ('PX', {2}), ('CH', {2})]
+
+#Settings that only change what is shown, in single sweep (RP0) they redraw the held sweep instead of starting a new one
+DISPLAY_SETTINGS = {name for name, modes in DISPLAY_ORDER} | {'SC', 'AM'}
+
+#Commands with three letters, everything else is two letters and a value
+COMMAND_PATTERN = r'(LFM|WTM|LST|LDS|LAN|LXS|LAD|LSP|LAS|LBS|LMK|PRS|HLT|RUN|[A-Z]{2})(-?[0-9.,]*)'
+
+#Makes SimulatedSAs, it has the same list_resources/open_resource/close as pyvisa.ResourceManager
+#resources are the names list_resources returns, options are given to every SimulatedSA it opens
+class SimulatedResourceManager:
+    def __init__ (self, resources = ('GPIB0::11::INSTR',), **options):
+        self.resources = tuple(resources)
+        self.options = options
+        self.instruments = {} #Opening the same name twice gives the same instrument, like the real bus
+    
+    def list_resources (self):
+        return self.resources
+    
+    def open_resource (self, resource_name):
+        if resource_name not in self.instruments:
+            self.instruments[resource_name] = SimulatedSA(resource_name, **self.options)
+        return self.instruments[resource_name]
+    
+    def close (self):
+        self.instruments = {}
+
+#Stands in for the pyvisa resource of an HP 3582A
+#tones is a list of (frequency in Hz, V rms) going into channel A, channel B sees them through a low pass filter at cutoff Hz
+#noise is the noise floor in V rms, overload=False turns the overload flags off, overload_level scales the level that overloads
+#command_latency is the time each write takes and byte_latency is the time each byte on the bus takes, both in seconds
+#fft_time is how long the SA takes to process and display a time record, time_scale speeds up (<1) or slows down every sweep
+class SimulatedSA:
+    def __init__ (self, resource_name = 'GPIB0::11::INSTR', tones = ((1000, 0.5), (2000, 0.05), (3000, 0.02)), noise = 1e-4,
+                  cutoff = 5000, overload = True, overload_level = 1.0, command_latency = 0.002, byte_latency = 50e-6,
+                  fft_time = 0.3, time_scale = 1.0, seed = 0):
+        self.resource_name = resource_name
+        self.tones = list(tones)
+        self.noise = noise
+        self.cutoff = cutoff
+        self.overload = overload
+        self.overload_level = overload_level
+        self.command_latency = command_latency
+        self.byte_latency = byte_latency
+        self.fft_time = fft_time
+        self.time_scale = time_scale
+        self.seed = seed
+        self.read_termination = '\r\n'
+        self.write_termination = '\r\n'
+        self.timeout = 2000
+        self.output = b''
+        self.preset()
+    
+    #Puts every setting back to PRS and starts a new measurement
+    def preset (self):
+        self.settings = dict(PRESET)
+        self.restart()
+    
+    #Starts a new time record, the status word only counts what happens after this
+    #In single sweep (RP0) nothing is measured until AR arms it, which is held at the end of its sweep (or its average)
+    def restart (self):
+        self.measure_start = time.perf_counter()
+        self.status_clear = self.measure_start
+        self.sweep_limit = None if self.settings['RP'] == 1 else 0
+    
+    def arm (self):
+        self.restart()
+        if self.settings['RP'] != 1:
+            self.sweep_limit = AVERAGE_COUNTS[self.settings['NU']] if self.settings['AV'] != 1 else 1
+    
+    #Time of one time record and of a whole sweep (time record plus processing)
+    def record_time (self):
+        return 400 / self.span() * self.time_scale
+    
+    def sweep_time (self):
+        return self.record_time() + self.fft_time * self.time_scale
+    
+    def span (self):
+        if self.settings['MD'] == 1:
+            return 25000
+        return SPAN_HZ[self.settings['SP'] - 1]
+    
+    #Number of sweeps that have finished since the measurement started at time now
+    def sweeps_done (self, now):
+        done = int((now - self.measure_start) / self.sweep_time())
+        return done if self.sweep_limit is None else min(done, self.sweep_limit)
+    
+    #The frequency of every point on a display of size points
+    def frequencies (self, points):
+        mode, adjust, span = self.settings['MD'], self.settings['AD'], self.span()
+        if mode == 3:
+            start = adjust
+        elif mode == 4:
+            start = adjust - 0.5 * span
+        else:
+            start = 0
+        return np.linspace(start, start + span, points)
+    
+    #Complex response of channel B compared to channel A
+    def response (self, frequencies):
+        return 1 / (1 + 1j * np.asarray(frequencies) / self.cutoff)
+    
+    #Whether each channel would overload at its sensitivity, the level is the rms of everything going in
+    def overloaded (self):
+        level_a = np.sqrt(sum(amp ** 2 for freq, amp in self.tones) + self.noise ** 2)
+        level_b = np.sqrt(sum((amp * abs(self.response(freq))) ** 2 for freq, amp in self.tones) + self.noise ** 2)
+        A_sens = SENSITIVITY_VOLTS[self.settings['AS'] - 1] * self.overload_level
+        B_sens = SENSITIVITY_VOLTS[self.settings['BS'] - 1] * self.overload_level
+        return self.overload and level_a > A_sens, self.overload and level_b > B_sens
+    
+    #Works out the status word from the time since the measurement started and since it was last cleared
+    def status (self):
+        now = time.perf_counter()
+        since = max(self.status_clear, self.measure_start)
+        status_word = 0
+        #A time record finishes fft_time before its sweep does
+        if self.sweeps_done(now + self.fft_time * self.time_scale) > self.sweeps_done(since + self.fft_time * self.time_scale):
+            status_word |= 16
+            A_over, B_over = self.overloaded()
+            if A_over and self.settings['IM'] in {1, 2}:
+                status_word |= 4
+            if B_over and self.settings['IM'] in {2, 3}:
+                status_word |= 8
+        if self.sweeps_done(now) > self.sweeps_done(since):
+            status_word |= 32
+        if self.settings['AV'] != 1 and self.sweeps_done(now) >= AVERAGE_COUNTS[self.settings['NU']]:
+            status_word |= 64
+        return status_word
+    
+    #The display of the newest sweep, as the values LDS lists and as the words in display memory
+    def display (self):
+        shown = [name for name, modes in DISPLAY_ORDER if self.settings[name] and self.settings['IM'] in modes][0:2]
+        if len(shown) == 0:
+            return np.zeros(256), np.zeros(256, dtype='>u2')
+        points = 256 // len(shown)
+        frequencies = self.frequencies(points)
+        width = PASSBAND_BINS[self.settings['PS']] * self.span() / points
+        
+        #Each sweep has its own noise, so the display only changes when a sweep finishes
+        rng = np.random.default_rng((self.seed, self.sweeps_done(time.perf_counter())))
+        averages = AVERAGE_COUNTS[self.settings['NU']] if self.settings['AV'] == 2 else 1
+        noise_power = self.noise ** 2 * rng.gamma(averages, 1 / averages, (2, points))
+        signal = np.zeros(points, dtype=complex)
+        for freq, amp in self.tones:
+            signal += amp * np.exp(-0.5 * ((frequencies - freq) / width) ** 2)
+        H = self.response(frequencies)
+        noise_phase = rng.uniform(-np.pi, np.pi, (2, points))
+        channels = {'A': (np.sqrt(np.abs(signal) ** 2 + noise_power[0]), np.where(np.abs(signal) > self.noise, 0, noise_phase[0])),
+                    'B': (np.sqrt(np.abs(signal * H) ** 2 + noise_power[1]), np.where(np.abs(signal) > self.noise, np.angle(H), noise_phase[1]))}
+        
+        dB_scale = self.settings['SC'] != 1
+        values, units = [], []
+        for name in shown:
+            if name in {'AA', 'AB'}:
+                sens = self.settings['AS' if name == 'AA' else 'BS'] - 1
+                amplitude = channels[name[1]][0]
+                if dB_scale:
+                    top = SENSITIVITY_DBV[sens] - 10 * (self.settings['AM'] - 1)
+                    values.append(20 * np.log10(amplitude))
+                    units.append((top - 102.3, 0.1))
+                else:
+                    values.append(amplitude)
+                    units.append((0.0, SENSITIVITY_VOLTS[sens] / 1000))
+            elif name in {'PA', 'PB'}:
+                values.append(np.degrees(channels[name[1]][1]))
+                units.append((-180.0, 0.5))
+            elif name == 'AX':
+                ratio = channels['B'][0] / channels['A'][0]
+                values.append(20 * np.log10(ratio) if dB_scale else ratio)
+                units.append((-60.0, 0.1) if dB_scale else (0.0, 0.002))
+            elif name == 'PX':
+                values.append(np.degrees(np.angle(np.exp(1j * (channels['B'][1] - channels['A'][1])))))
+                units.append((-180.0, 0.5))
+            else:
+                signal_power = np.abs(signal) ** 2
+                values.append(signal_power / (signal_power + self.noise ** 2))
+                units.append((0.0, 0.001))
+        
+        #Rounds to what the display can show, so LDS and the display memory agree, each unit is (bottom, step)
+        words = np.concatenate([np.clip(np.round((x - unit[0]) / unit[1]), 0, 1023) for x, unit in zip(values, units)])
+        bottoms = np.repeat([unit[0] for unit in units], points)
+        steps = np.repeat([unit[1] for unit in units], points)
+        return bottoms + words * steps, words.astype('>u2')
+    
+    #Waits for the bus to carry size bytes
+    def bus_wait (self, size, command = False):
+        time.sleep(self.byte_latency * size + (self.command_latency if command else 0))
+    
+    def write (self, command):
+        self.bus_wait(len(command) + len(self.write_termination), True)
+        for mnemonic, value in re.findall(COMMAND_PATTERN, command.upper()):
+            self.execute(mnemonic, value)
+    
+    #Does one command, list commands put their answer in output for the next read
+    def execute (self, mnemonic, value):
+        if mnemonic == 'PRS':
+            self.preset()
+        elif mnemonic == 'LST':
+            self.output = bytes([self.status()])
+            if value == '0':
+                self.status_clear = time.perf_counter()
+        elif mnemonic == 'LDS':
+            self.output = (','.join(np.char.mod('%+.2E', self.display()[0])) + self.read_termination).encode('ascii')
+        elif mnemonic == 'LFM':
+            address, words = value.split(',')
+            memory = np.zeros(512, dtype='>u2')
+            if address == '74000':
+                display_words = self.display()[1]
+                memory[0:display_words.size] = display_words
+            self.output = memory[0:int(words)].tobytes()
+        elif mnemonic == 'LAN':
+            self.output = (self.alphanumerics() + self.read_termination).encode('ascii')
+        elif mnemonic == 'LXS':
+            self.output = self.listing(SENSITIVITY_DBV[self.settings['BS'] - 1] - SENSITIVITY_DBV[self.settings['AS'] - 1])
+        elif mnemonic == 'LAS':
+            self.output = self.listing(SENSITIVITY_VOLTS[self.settings['AS'] - 1])
+        elif mnemonic == 'LBS':
+            self.output = self.listing(SENSITIVITY_VOLTS[self.settings['BS'] - 1])
+        elif mnemonic == 'LAD':
+            self.output = ('%07.1f' % self.settings['AD'] + self.read_termination).encode('ascii')
+        elif mnemonic == 'LSP':
+            self.output = ('%g' % self.span() + self.read_termination).encode('ascii')
+        elif mnemonic == 'LMK':
+            values = self.display()[0]
+            index = min(self.settings['MP'], values.size - 1)
+            frequency = self.frequencies(values.size)[index]
+            self.output = ('%+.3E,%05d' % (values[index], frequency) + self.read_termination).encode('ascii')
+        elif mnemonic == 'RE':
+            self.restart()
+        elif mnemonic == 'AR':
+            self.arm()
+        elif mnemonic in {'TS', 'RS', 'MS', 'MF', 'PL', 'HLT', 'RUN', 'WTM'}:
+            pass #Actions that dont change what is simulated
+        elif mnemonic in self.settings and value != '':
+            self.settings[mnemonic] = int(float(value))
+            if self.settings['RP'] == 1 or mnemonic not in DISPLAY_SETTINGS:
+                self.restart() #A new setting starts a new time record, like the real one
+    
+    def listing (self, value):
+        return ('%+.2E' % value + self.read_termination).encode('ascii')
+    
+    #Four lines of 32 characters, like the top of the real display
+    def alphanumerics (self):
+        span = self.span()
+        span_text = ('%gKHZ' % (span / 1000)) if span >= 1000 else ('%gHZ' % span)
+        lines = ['MODE ' + str(self.settings['MD']) + '  SPAN ' + span_text,
+                 'ADJ ' + str(self.settings['AD']) + 'HZ',
+                 'A ' + '%+d' % SENSITIVITY_DBV[self.settings['AS'] - 1] + 'DBV  B ' + '%+d' % SENSITIVITY_DBV[self.settings['BS'] - 1] + 'DBV',
+                 'SIMULATED 3582A']
+        return ''.join(x[0:32].ljust(32) for x in lines)
+    
+    def read_raw (self):
+        output, self.output = self.output, b''
+        self.bus_wait(len(output))
+        return output
+    
+    def read (self):
+        return self.read_raw().decode('ascii').removesuffix(self.read_termination)
+    
+    def read_bytes (self, count, break_on_termchar = False):
+        output, self.output = self.output[0:count], self.output[count:]
+        self.bus_wait(len(output))
+        return output
+    
+    def query (self, command):
+        self.write(command)
+        return self.read()
+    
+    def query_ascii_values (self, command, converter = 'f', separator = ',', container = list):
+        return container([float(x) for x in self.query(command).split(separator)])
+    
+    def close (self):
+        pass
@@ -1,631 +1,903 @@
-# -*- coding: utf-8 -*-
-"""
-Created on Thu Aug  7 15:44:19 2025
-
-Generates a virtual control panal for old HP Spectrum Analyzers pre 1990 using tkinter to
-make the GUI, pyvisa to communicate with the SA, matplotlib to generate plots, and numpy to 
-create and export data arrays
-
-@author: Jack Cochrane
-"""
-
-import tkinter as tk
-from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg, NavigationToolbar2Tk)
-from matplotlib.figure import Figure
-import pyvisa 
-import numpy as np
-import time
-from pathlib import Path
-from datetime import datetime, timezone
-
-
-#Called by the im checkboxes to ensure that only two cam be selected at any given time
-def toggle_im_enable ():
-    im_vars_sum=0
-    for x in input_mode_vars:
-        im_vars_sum += x.get()
-    if im_vars_sum >= 2:
-        for x in im_cb:
-            if input_mode_vars[im_cb.index(x)].get() == 0:
-                x['state'] = tk.DISABLED
-            else:
-                x['state'] = tk.NORMAL
-    else:
-        for x in im_cb:
-            x['state'] = tk.NORMAL
-
-#Allows for one line configuration of tkinter row/column weight
-def row_col_config (to_grid, rows, columns):
-    rows = enumerate(rows)
-    columns = enumerate(columns)
-    for x, y in rows:
-        to_grid.rowconfigure(x, weight=y)
-    for x, y in columns:
-        to_grid.columnconfigure(x, weight=y)
-        
-#Called by buttons/menus to write commands to the spectrum analyzer
-def write_data (command):
-    SA.write(command)
-    time.sleep(0.1)
-
-#refreshes alphanumerics, called by refresh_all_display_widgets
-def refresh_alphanumerics ():
-    val = SA.query('LAN')
-    val = val.replace('*', '°')
-    val = val[0:32] + '\n' + val[32:64] + '\n' + val[64:96] + '\n' + val[96:128]
-    alphanumerics_var.set(val)
-
-#refreshes both overloads, called by refresh_all_display widgets
-def refresh_overload ():
-    SA.write('LST0')
-    SA.write('LST1')
-    status_word = SA.read_bytes(1)
-    if (int.from_bytes(status_word)&4)==4:
-        A_overload_var.set('Overload')
-    else:
-        A_overload_var.set('Normal')
-    if (int.from_bytes(status_word)&8)==8:
-        B_overload_var.set('Overload')
-    else:
-        B_overload_var.set('Normal')
-    transfer_sens_var.set(SA.query('LXS') + 'dBV')
-
-#Makes the Input Mode list
-def make_im_list ():
-    im_list =['A Amplitude', 'A Phase', 'B Amplitude', 'B Phase', 'Transfer Amplitude', 'Transfer Phase', 'Coherance']
-    if y_scale_var.get() == 1:
-        amp_type = ''
-    else:
-        amp_type = 'dB'
-    im_data_types = [amp_type + 'V', 'Deg', amp_type + 'V', 'Deg', amp_type, 'Deg', '']
-    im_list = list(zip(im_list, input_mode_vars, im_data_types))
-    return im_list
-
-#refreshes/generates the figure/plots and toolbar
-def refresh_figure_toolbar ():
-    #Make and set two vars flag, get vars, make im list
-    global two_vars
-    two_vars=False
-    im_list = make_im_list() #element tuple (name, on/off, datatype)
-    global figure_vars
-    figure_vars = []
-    for x in im_list:
-        if x[1].get() == 1:
-            figure_vars.append(x)   
-    if len(figure_vars) >= 2:
-        two_vars=True
-    
-    #Get value array, split as needed, add to list, zip into figure_vars, need to confirm that ordering is correct
-    if two_vars:
-         values = np.split(SA.query_ascii_values('LDS', container=np.array), 2)
-    else:
-        values = [SA.query_ascii_values('LDS', container=np.array)]
-    figure_vars = list(zip(figure_vars, values))  #element tuple ((name, on/off, datatype,) data array)
-    
-    #generate the frequency array
-    freq_span_val = ''
-    for x in span_var.get():
-        if x.isdigit():
-            freq_span_val += x
-        elif x == 'k':
-            freq_span_val += '000'
-    freq_span_val = int(freq_span_val)
-    
-    global freq_vals
-    if frequency_mode_var.get() == 1:
-        freq_vals = np.linspace(0, 25000, num = values[0].size)
-    elif frequency_mode_var.get() == 2:
-        freq_vals = np.linspace(0, freq_span_val, num = values[0].size)
-    elif frequency_mode_var.get() == 3:
-        freq_vals = np.linspace (adjust_var.get() - 0.5 * freq_span_val, adjust_var.get() + 0.5 * freq_span_val, num = values[0].size)
-    elif frequency_mode_var.get() == 4:
-        freq_vals = np.linspace (adjust_var.get(), freq_span_val + adjust_var.get(), num = values[0].size)
-    figure_vars = list(enumerate(figure_vars)) #element tuple (index, ((name, on/off, datatype,) data array))
-    
-    redraw_display ()
-        
-#Generates plot, alphanumerics, and overload on startup and on pressing refresh
-def refresh_all_display_widgets ():
-    refresh_alphanumerics()
-    refresh_overload()
-    refresh_figure_toolbar()
-
-#Automatially sets the sensitivity to a value that it doesnt immediately overload
-def set_sensitivity ():
-    #Turn off average
-    avg_type_var.set(1)
-    SA.write('AV1')
-    
-    #Initialize and define needed variables
-    A_done = False
-    B_done = False
-    AS = 2
-    BS = 2
-
-    #function loop
-    while not (A_done and B_done):
-        if not A_done:
-            AS += 1
-        if not B_done:
-            BS += 1
-        if AS>10 or BS>10:
-            raise ValueError("Sensitivity went out of bounds") #Prevents sending the SA an invalid command
-        SA.write('AS' + str(AS) + 'BS' + str(BS) + 'LST0')
-        time.sleep(0.1)
-        SA.write('LST1')
-        status_word = int.from_bytes(SA.read_bytes(1)) #Gets status word
-        if (status_word & 4) == 4: #Decreases A sens if A overload flag is raised
-            AS -= 1
-            A_done = True
-        if (status_word & 8) == 8: #Decreases B sens if B overload flag is raised
-            BS -= 1
-            B_done = True
-    
-    A_sens_var.set(sens_list[AS-1])
-    B_sens_var.set(sens_list[BS-1])
-    transfer_sens_var.set(SA.query('LXS') + 'dBV')
-    refresh_overload()
-     
-#Resets display vars to match prs
-def preset_values ():
-    trace_1.set(0)
-    trace_2.set(0)
-    passband_var.set(1)
-    A_sens_var.set(sens_list[1])
-    B_sens_var.set(sens_list[1])
-    transfer_sens_var.set(SA.query('LXS') + 'dBV')
-    #A_amplitude, A_phase, B_amplitude, B_phase, transfer_amplitude, transfer_phase, coherance
-    input_mode_vars[0].set(1)
-    input_mode_vars[1].set(0)
-    input_mode_vars[2].set(0)
-    input_mode_vars[3].set(0)
-    input_mode_vars[4].set(0)
-    input_mode_vars[5].set(0)
-    input_mode_vars[6].set(0)
-    x_scale_var.set(0)
-    y_scale_var.set(2)
-    frequency_mode_var.set(1)
-    span_var.set(span_list[13])
-    adjust_var.set(0)
-    A_coupling_var.set(1)
-    B_coupling_var.set(1)
-    avg_type_var.set(1)
-    sample_num_var.set(1)
-    shift_var.set(0)
-    free_run_var.set(1)
-    repetative_var.set(1)
-    alphanumerics_var.set(SA.query('LAN'))
-    ref_level_var.set(1)
-    toggle_im_enable ()
-    recall_trace_1.configure(relief=tk.RAISED)
-    recall_trace_2.configure(relief=tk.RAISED)
-    free_run.configure(relief=tk.SUNKEN)
-    repetative.configure(relief=tk.SUNKEN)
-    number_shift.configure(relief=tk.RAISED)
-    
-#Toggles the display of data points, also used to refresh the display without changing data
-def redraw_display (*args):
-    #Clear the figure generate axs to put data in, create axes
-    fig.clf()
-    
-    if data_points_var.get():
-        line_type = '-2'
-    else:
-        line_type = '-'
-    global ax
-    if two_vars:
-        ax = fig.subplots(2, sharex=True)
-        for i, x in figure_vars:
-            ax[i].set_title(x[0][0])
-            if x_scale_var.get()==1:
-                ax[i].semilogx(freq_vals, x[1], line_type)
-            else:
-                ax[i].plot(freq_vals, x[1], line_type)
-            ax[i].set_xlabel('Frequency (Hz)')
-            ax[i].set_ylabel(x[0][2])
-            ax[i].grid(which='both')
-            ax[i].axvline(x=freq_vals[display_slider_var.get()], visible=display_toggle_on.get(), color=cursor_color, lw=1, label= str("%.2f" % freq_vals[display_slider_var.get()]) + 'Hz, ' + str("%.2f" % x[1][display_slider_var.get()]) + x[0][2])
-            ax[i].axhline(y=x[1][display_slider_var.get()], visible=display_toggle_on.get(), color=cursor_color, lw=1)
-            if display_toggle_on.get():
-                ax[i].legend()
-            
-    else:
-        ax=fig.subplots()
-        for i, x in figure_vars:
-            ax.set_title(x[0][0])
-            if x_scale_var.get()==1:
-                ax.semilogx(freq_vals, x[1], line_type)
-            else:
-                ax.plot(freq_vals, x[1], line_type)
-            ax.set_xlabel('Frequency (Hz)')
-            ax.set_ylabel(x[0][2])
-            ax.grid(which='both')
-            ax.axvline(x=freq_vals[display_slider_var.get()], visible=display_toggle_on.get(), color=cursor_color, lw=1, label=str("%.2f" % freq_vals[display_slider_var.get()]) + 'Hz, ' + str("%.2f" % x[1][display_slider_var.get()])+ x[0][2])
-            ax.axhline(y=x[1][display_slider_var.get()], visible=display_toggle_on.get(), color=cursor_color, lw=1)
-            if display_toggle_on.get():
-                ax.legend()
-    
-    passband_list = ['error', 'Flattop', 'Hanning', 'Uniform']
-    fig.suptitle(t=('Passband Shape: '+ passband_list[passband_var.get()]), size='medium', ha='left', va='bottom', x=0.02, y=0.02)
-    data_display.draw()
-
-#Exports/saves data
-def export_data ():
-    #figure_vars element tuple (index, ((name, on/off, datatype,) data array))
-    if file_name_var.get() == '' or file_name_var.get().isspace():
-        export_name = 'SA_data/data_set_' + datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d_T%H-%M-%S") + '.csv'
-    else:
-        export_name = 'SA_data/' + file_name_var.get() + '.csv'
-
-    if two_vars:
-        export_array = np.rot90(np.array([freq_vals, figure_vars[0][1][1], figure_vars[1][1][1]]))
-        export_header = ' Frequency (Hz)' + ',' + figure_vars[0][1][0][0] + ' ' + figure_vars[0][1][0][2] + ',' + figure_vars[1][1][0][0] + ' ' + figure_vars[1][1][0][2]
-    else:
-        export_array = np.rot90(np.array([freq_vals, figure_vars[0][1][1]]))
-        export_header = 'Frequency (Hz)' + ',' + figure_vars[0][1][0][0] + ' ' + figure_vars[0][1][0][2]
-    
-    np.savetxt(export_name, export_array, header=export_header, delimiter=',', comments='')
-
-#Allows normal buttons to be used as checkboxes
-def toggle_button (button, button_var):
-    if button_var.get() == 1:
-        button.configure(relief=tk.RAISED)
-        button_var.set(0)
-    else:
-        button.configure(relief=tk.SUNKEN)
-        button_var.set(1)
-
-#Toggles the cursor slider on and off
-def dis_slider_toggle ():
-    if display_toggle_on.get() == 1:
-        display_toggle.configure(relief=tk.RAISED)
-        display_toggle_on.set(0)
-    else:
-        display_toggle.configure(relief=tk.SUNKEN)
-        display_toggle_on.set(1)
-    redraw_display()
-
-
-#Create data storage folders if they do not exist already
-path_string = "SA_data"
-path = Path(path_string)
-path.mkdir(parents=False, exist_ok=True)
-
-#Makes the resource manager then spectrum analyzer(SA) objects
-rm = pyvisa.ResourceManager()
-SA = rm.open_resource('GPIB::11')
-SA.read_termination = '\r\n' #Correctly sets the read termination
-SA.write_termination = '\r\n' #Correctly sets the write termination
-
-#Initialize the instrument
-SA.write('PRS')
-time.sleep(0.1)
-SA.write('IM2')
-time.sleep(0.1)
-
-#Makes the object root which is the base object of the window
-root = tk.Tk()
-root.wm_title("HP3582A Spectrum Analyzer")
-
-
-#Make a master frame to store all of the content
-content = tk.Frame(root)
-
-#Initialize the variables
-trace_1 = tk.IntVar(value=0)
-trace_2 = tk.IntVar(value=0)
-passband_var = tk.IntVar(value=1)
-sens_list = ['CAL', '30 V, + 30 dBV', '10 V, +20 dBV', '3 V, +10 dBV', '1 V, +0 dBV', '.3 V, -10 dBV', '.1 V, -20 dBV', '30 mV, -30 dBV', '10 mV, -40 dBV', '3 mV,-50 dBV']
-A_sens_var = tk.StringVar(value=sens_list[1])
-B_sens_var = tk.StringVar(value=sens_list[1])
-transfer_sens_var = tk.StringVar(value = SA.query('LXS'))
-SA.write('LST1')
-A_overload_var = tk.StringVar(value='Normal')
-SA.write('LST1')
-B_overload_var = tk.StringVar(value='Normal')
-#A_amplitude, A_phase, B_amplitude, B_phase, transfer_amplitude, transfer_phase, coherance
-input_mode_vars = [tk.IntVar(value=1), tk.IntVar(value=0), tk.IntVar(value=0), tk.IntVar(value=0), tk.IntVar(value=0), tk.IntVar(value=0), tk.IntVar(value=0)]
-x_scale_var = tk.IntVar(value=0)
-y_scale_var = tk.IntVar(value=2)
-frequency_mode_var = tk.IntVar(value=1)
-span_list = ['1Hz', '2.5Hz', '5Hz', '10Hz', '25Hz', '50Hz', '100Hz', '250Hz', '500Hz', '1kHz', '2.5kHz', '5kHz', '10kHz', '25kHz']
-span_var = tk.StringVar(value=span_list[13])
-adjust_var = tk.IntVar(value=0)
-A_coupling_var = tk.IntVar(value=1)
-B_coupling_var = tk.IntVar(value=1)
-avg_type_var = tk.IntVar(value=1)
-sample_num_var = tk.IntVar(value=1)
-shift_var = tk.IntVar(value=0)
-free_run_var = tk.IntVar(value=1)
-repetative_var = tk.IntVar(value=1)
-alphanumerics_var = tk.StringVar(value = SA.query('LAN'))
-data_points_var = tk.BooleanVar(value=False)
-ref_level_var = tk.IntVar(value=1)
-file_name_var = tk.StringVar(value='')
-font_small = ("Arial", 12)
-font_big = ("Arial", 18)
-display_slider_var = tk.IntVar(value=0)
-display_toggle_on = tk.BooleanVar(value=False)
-display_toggle_var = tk.StringVar(value='Toggle\nCursor')
-cursor_color = 'black'
-
-#Make a frame to put the display into
-display = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Create the data display
-fig = Figure(figsize=(5, 4), dpi=100)
-data_display = FigureCanvasTkAgg(fig, master=display)  #Initializes the figure as a tk canvas
-
-#create the data display toolbar
-tool_bar = NavigationToolbar2Tk(data_display, display, pack_toolbar=False)
-tool_bar.update()
-
-#create the other widgets
-display_slider_label = tk.Label(display, text='Cursor', font=font_small)
-display_slider = tk.Scale(display, from_=0, to=127, variable=display_slider_var, orient=tk.HORIZONTAL, resolution=1, showvalue=0, command=redraw_display)
-display_toggle = tk.Button(display, relief=tk.RAISED, font=font_small, textvariable=display_toggle_var, command=dis_slider_toggle)
-
-#grid display
-tool_bar.grid(row=13, column=0, rowspan=2, columnspan=14, sticky='nwes')
-data_display.get_tk_widget().grid(row=0, column=0, columnspan=15, rowspan=12, sticky='nwes')
-display_slider_label.grid(row=12, column=0, sticky='nwes')
-display_slider.grid(row=12, column=1, columnspan=13, sticky='we')
-display_toggle.grid(row=12, column=14, rowspan=3, sticky='nwes')
-row_col_config(display, rows=[1]*12, columns=[1]*15)
-
-#Make a frame to put the trace buttons in
-trace = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Make the buttons to put into trace
-store_trace_1 = tk.Button(trace, text="Store Trace 1", font=font_small, command=lambda: [write_data('TS')])
-store_trace_2 = tk.Button(trace, text="Store Trace 2", font=font_small, command=lambda: [write_data('RS')])
-recall_trace_1 = tk.Button(trace, text="Recall Trace 1", font=font_small, relief=tk.RAISED, command=lambda: [toggle_button(recall_trace_1, trace_1), write_data('TR'+str(trace_1.get()))])
-recall_trace_2 = tk.Button(trace, text="Recall Trace 2", font=font_small, relief=tk.RAISED, command=lambda: [toggle_button(recall_trace_2, trace_2), write_data('RR'+str(trace_2.get()))])
-
-#grid trace, configure rows/columns
-store_trace_1.grid(row=0, column=0, sticky='nwes')
-store_trace_2.grid(row=0, column=1, sticky='nwes')
-recall_trace_1.grid(row=1, column=0, sticky='nwes')
-recall_trace_2.grid(row=1, column=1, sticky='nwes')
-row_col_config(trace, rows=[1, 1], columns=[1, 1])
-
-
-#Make a frame to put passband radiobuttons in, define the intVar for passband
-passband = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Make the lable and buttons to put in the frame
-passband_label = tk.Label(passband, text="Passband Shape", font=font_small)
-flattop = tk.Radiobutton(passband, text="Flattop", variable=passband_var, value=1, font=font_small, command=lambda: [write_data('PS'+str(passband_var.get())), refresh_all_display_widgets()])
-hanning = tk.Radiobutton(passband, text="Hanning", variable=passband_var, value=2, font=font_small, command=lambda: [write_data('PS'+str(passband_var.get())), refresh_all_display_widgets()])
-uniform = tk.Radiobutton(passband, text="Uniform", variable=passband_var, value=3, font=font_small, command=lambda: [write_data('PS'+str(passband_var.get())), refresh_all_display_widgets()])
-
-#grid passband, configure rows/col
-passband_label.grid(row=0, column=0, sticky='nwes')
-flattop.grid(row=1, column=0, sticky='nwes')
-hanning.grid(row=2, column=0, sticky='nwes')
-uniform.grid(row=3, column=0, sticky='nwes')
-row_col_config(passband, rows=[1,1,1,1], columns=[1])
-
-
-#Make a frame to put sensetivity widgets in, define nessesary variables
-sensitivity = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Make the OptionMenus, Overload Indecators, Transfer Sensitivity, AutoSense Button, and labels
-A_sens = tk.OptionMenu(sensitivity, A_sens_var, *sens_list, command=lambda x: [write_data(('AS' + str(sens_list.index(A_sens_var.get())+1))), refresh_overload()])
-B_sens = tk.OptionMenu(sensitivity, B_sens_var, *sens_list, command=lambda x: [write_data(('BS' + str(sens_list.index(B_sens_var.get())+1))), refresh_overload()])
-transfer_sens = tk.Label(sensitivity, textvariable = transfer_sens_var, font=font_small, highlightbackground="grey", highlightthickness=1)
-auto_sens = tk.Button(sensitivity, text="Auto Sensitivity", font=font_small, command=set_sensitivity)
-A_sens_label = tk.Label(sensitivity, text="A Sensitivity", font=font_small, highlightbackground="grey", highlightthickness=1)
-B_sens_label = tk.Label(sensitivity, text="B Sensitivity", font=font_small, highlightbackground="grey", highlightthickness=1)
-transfer_sens_label = tk.Label(sensitivity, text="Transfer Sensitivity", font=font_small, highlightbackground="grey", highlightthickness=1)
-A_overload_label = tk.Label(sensitivity, text="A Overload", font=font_small, highlightbackground="grey", highlightthickness=1)
-B_overload_label = tk.Label(sensitivity, text="B Overload", font=font_small, highlightbackground="grey", highlightthickness=1)
-A_overload = tk.Label(sensitivity, textvariable=A_overload_var, font=font_small, highlightbackground="grey", highlightthickness=1)
-B_overload = tk.Label(sensitivity, textvariable=B_overload_var, font=font_small, highlightbackground="grey", highlightthickness=1)
-
-#grid sensitivity, congigure rows/comlumns
-A_sens_label.grid(row=0, column=0, sticky='nwes')
-A_sens.grid(row=1, column=0, sticky='nwes')
-A_overload_label.grid(row=0, column=1, sticky='nwes')
-A_overload.grid(row=1, column=1, sticky='nwes')
-B_sens_label.grid(row=0, column=2, sticky='nwes')
-B_sens.grid(row=1, column=2, sticky='nwes')
-B_overload_label.grid(row=0,column=3, sticky='nwes')
-B_overload.grid(row=1, column=3, sticky='nwes')
-transfer_sens_label.grid(row=0, column=4, sticky='nwes')
-transfer_sens.grid(row=1, column=4, sticky='nwes')
-auto_sens.grid(row=0, rowspan=2, column=5, sticky='nwes')
-row_col_config(sensitivity, rows=[1,1], columns=[4,2,4,2,4,2])
-
-
-#make a frame to put input mode widgets in and to define checkbutton variables and function
-input_mode = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Make the needed widgets, add checkboxes to a list to allow for ease of use in enable function
-im_label = tk.Label(input_mode, text="Input Mode", font=font_small)
-im_amp_label = tk.Label(input_mode, text="Amplitude:", font=font_small)
-im_phase_label = tk.Label(input_mode, text="Phase:", font=font_small)
-A_amplitude = tk.Checkbutton(input_mode, text="A", font=font_small, variable=input_mode_vars[0], command=lambda: [toggle_im_enable(), write_data('AA'+str(input_mode_vars[0].get()))])
-A_phase = tk.Checkbutton(input_mode, text="A", font=font_small, variable=input_mode_vars[1], command=lambda: [toggle_im_enable(), write_data('PA'+str(input_mode_vars[1].get()))])
-B_amplitude = tk.Checkbutton(input_mode, text="B", font=font_small, variable=input_mode_vars[2], command=lambda: [toggle_im_enable(), write_data('AB'+str(input_mode_vars[2].get()))])
-B_phase = tk.Checkbutton(input_mode, text="B", font=font_small, variable=input_mode_vars[3], command=lambda: [toggle_im_enable(), write_data('PB'+str(input_mode_vars[3].get()))])
-transfer_amplitude = tk.Checkbutton(input_mode, text="Transfer", font=font_small, variable=input_mode_vars[4], command=lambda: [toggle_im_enable(), write_data('AX'+str(input_mode_vars[4].get()))])
-transfer_phase = tk.Checkbutton(input_mode, text="Transfer", font=font_small, variable=input_mode_vars[5], command=lambda: [toggle_im_enable(), write_data('PX'+str(input_mode_vars[5].get()))])
-coherance = tk.Checkbutton(input_mode, text="Coherance", font=font_small, variable=input_mode_vars[6], command=lambda: [toggle_im_enable(), write_data('CH'+str(input_mode_vars[6].get()))])
-im_cb = [A_amplitude, A_phase, B_amplitude, B_phase, transfer_amplitude, transfer_phase, coherance]
-
-#Grid input mode, configure rows/colums 
-im_label.grid(row=0, column=0, columnspan=1, sticky='nwes')
-im_amp_label.grid(row=1, column=0, sticky='nwes')
-im_phase_label.grid(row=2, column=0, sticky='nwes')
-A_amplitude.grid(row=1, column=1, sticky='nwes')
-B_amplitude.grid(row=1, column=2, sticky='nwes')
-transfer_amplitude.grid(row=1, column=3, sticky='nwes')
-coherance.grid(row=0, column=3, sticky='nwes')
-A_phase.grid(row=2, column=1, sticky='nwes')
-B_phase.grid(row=2, column=2, sticky='nwes')
-transfer_phase.grid(row=2, column=3, sticky='nwes')
-row_col_config(input_mode, rows=[1,1,1], columns=[1,1,1,1])
-
-
-#Make a frame to put the scale in, and define needed variables
-scale = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Make the needed widgets
-x_scale_label = tk.Label(scale, text = "X Scale", font=font_small)
-y_scale_label = tk.Label(scale, text = "Y Scale", font=font_small)
-y_scale_lin = tk.Radiobutton(scale, text= "Linear", variable=y_scale_var, value=1, font=font_small, command=lambda: [write_data('SC' + str(y_scale_var.get()))])
-y_scale_10dB = tk.Radiobutton(scale, text="10dB/DIV", variable=y_scale_var, value=2, font=font_small, command=lambda: [write_data('SC' + str(y_scale_var.get()))])
-y_scale_20dB = tk.Radiobutton(scale, text="20dB/DIV", variable=y_scale_var, value=3, font=font_small, command=lambda: [write_data('SC' + str(y_scale_var.get()))])
-x_scale_lin = tk.Radiobutton(scale, text="Linear", variable=x_scale_var, value=0, font=font_small, command=redraw_display)
-x_scale_log = tk.Radiobutton(scale, text="Log", variable=x_scale_var, value=1, font=font_small, command=redraw_display)
-data_points = tk.Button(scale, text ="Show Datapoints", relief=tk.RAISED, font=font_small, command=lambda: [toggle_button(data_points, data_points_var), redraw_display()])
-
-
-#Grid scale, configure rows/cols
-y_scale_label.grid(row=0, column=0, sticky='nwes')
-x_scale_label.grid(row=0, column=1, sticky='nwes')
-y_scale_lin.grid(row=1, column=0, sticky='nwes')
-x_scale_lin.grid(row=1, column=1, sticky='nwes')
-y_scale_10dB.grid(row=2, column=0, sticky='nwes')
-x_scale_log.grid(row=2, column=1, sticky='nwes')
-y_scale_20dB.grid(row=3, column=0, sticky='nwes')
-data_points.grid(row=3, column=1, sticky='nwes')
-row_col_config(scale, rows=[1,1,1], columns=[1,1])
-
-
-#Make a frame to put frequency in, and define needed variables
-frequency = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Make the needed widgets
-frequency_mode_label = tk.Label(frequency, text="Frequency Mode", font=font_small)
-frequency_mode_1 = tk.Radiobutton(frequency, text="0-25kHz", font=font_small, variable=frequency_mode_var, value=1, command=lambda: [write_data('MD' + str(frequency_mode_var.get())), write_data('RE')])
-frequency_mode_2 = tk.Radiobutton(frequency, text="0-Span", font=font_small, variable=frequency_mode_var, value=2, command=lambda: [write_data('MD' + str(frequency_mode_var.get())), write_data('RE')])
-frequency_mode_3 = tk.Radiobutton(frequency, text="Adjust Start, Span", font=font_small, variable=frequency_mode_var, value=4, command=lambda: [write_data('MD' + str(frequency_mode_var.get())), write_data('RE')])
-frequency_mode_4 = tk.Radiobutton(frequency, text="Ajust Center, Span", font=font_small, variable=frequency_mode_var, value=3, command=lambda: [write_data('MD' + str(frequency_mode_var.get())), write_data('RE')])
-span_label = tk.Label(frequency, text="Freqency Span", font=font_small)
-span_menu = tk.OptionMenu(frequency, span_var, *span_list, command=lambda x: [write_data('SP' + str(span_list.index(span_var.get())+1)), write_data('RE')])
-adjust_slider = tk.Scale(frequency, label="Frequncy Adjust (Hz)", font=font_small, variable=adjust_var, from_=0, to=24999, orient=tk.HORIZONTAL, command=lambda x: [write_data('AD' + str(adjust_var.get()))])
-ref_level_slider = tk.Scale(frequency, label="Amplitude Reference Level", font=font_small, variable=ref_level_var, from_=1, to=9, orient=tk.HORIZONTAL, resolution=1, showvalue=0, repeatdelay=1000, command=lambda x: [write_data('AM' + str(ref_level_var.get())), refresh_figure_toolbar(), refresh_alphanumerics()])
-
-#Grid frequency and configure rows/columns
-frequency_mode_label.grid(row=0, column=1, columnspan=2, sticky='nwes')
-span_label.grid(row=0, column=0, sticky='nwes')
-span_menu.grid(row=1, column=0, sticky='nwes')
-frequency_mode_1.grid(row=1, column=1, sticky='nwes')
-frequency_mode_2.grid(row=2, column=1, sticky='nwes')
-frequency_mode_3.grid(row=1, column=2, sticky='nwes')
-frequency_mode_4.grid(row=2, column=2, sticky='nwes')
-adjust_slider.grid(row=3, column=0, columnspan=3, sticky='nwes')
-ref_level_slider.grid(row=4, column=0, columnspan=3, sticky='nwes')
-row_col_config(frequency, rows=[1,1,1,4,4], columns=[1,1,1])
-
-
-#Make frame to put coupling in, initiate vars
-coupling = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Make the needed widgets
-A_coupling_label = tk.Label(coupling, text="A Coupling", font=font_small)
-B_coupling_label = tk.Label(coupling, text="B Coupling", font=font_small)
-A_ac = tk.Radiobutton(coupling, text="AC", variable=A_coupling_var, value=1, font=font_small, command=lambda: [write_data('AC' + str(A_coupling_var.get()))])
-A_dc = tk.Radiobutton(coupling, text="DC", variable=A_coupling_var, value=2, font=font_small, command=lambda: [write_data('AC' + str(A_coupling_var.get()))])
-B_ac = tk.Radiobutton(coupling, text="AC", variable=B_coupling_var, value=1, font=font_small, command=lambda: [write_data('BC' + str(B_coupling_var.get()))])
-B_dc = tk.Radiobutton(coupling, text="DC", variable=B_coupling_var, value=2, font=font_small, command=lambda: [write_data('BC' + str(B_coupling_var.get()))])
-
-#Grid coupling, config rows/columns
-A_coupling_label.grid(row=0, column=0, sticky='nwes')
-B_coupling_label.grid(row=0, column=1, sticky='nwes')
-A_ac.grid(row=1, column=0, sticky='nwes')
-B_ac.grid(row=1, column=1, sticky='nwes')
-A_dc.grid(row=2, column=0, sticky='nwes')
-B_dc.grid(row=2, column=1, sticky='nwes')
-row_col_config(coupling, rows=[1,1,1], columns=[1,1])
-
-
-#Make frame to put average in, initiate vars
-average = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Make the needed widgets
-avg_type_label = tk.Label(average, text="Average Type", font=font_small)
-sample_num_label = tk.Label(average, text="Sample Number", font=font_small)
-avg_type_1 = tk.Radiobutton(average, text="Off", variable=avg_type_var, value=1, font=font_small, command=lambda: [write_data('AV' + str(avg_type_var.get()))])
-avg_type_2 = tk.Radiobutton(average, text="RMS", variable=avg_type_var, value=2, font=font_small, command=lambda: [write_data('AV' + str(avg_type_var.get()))])
-avg_type_3 = tk.Radiobutton(average, text="Time", variable=avg_type_var, value=3, font=font_small, command=lambda: [write_data('AV' + str(avg_type_var.get()))])
-avg_type_4 = tk.Radiobutton(average, text="Peak", variable=avg_type_var, value=4, font=font_small, command=lambda: [write_data('AV' + str(avg_type_var.get()))])
-sample_num_1 = tk.Radiobutton(average, text="4/64", variable=sample_num_var, value=1, font=font_small, command=lambda: [write_data('NU' + str(sample_num_var.get()))])
-sample_num_2 = tk.Radiobutton(average, text="8/128", variable=sample_num_var, value=2, font=font_small, command=lambda: [write_data('NU' + str(sample_num_var.get()))])
-sample_num_3 = tk.Radiobutton(average, text="16/256", variable=sample_num_var, value=3, font=font_small, command=lambda: [write_data('NU' + str(sample_num_var.get()))])
-sample_num_4 = tk.Radiobutton(average, text="32/Exp", variable=sample_num_var, value=4, font=font_small, command=lambda: [write_data('NU' + str(sample_num_var.get()))])
-restart_average = tk.Button(average, text="Restart", font=font_small, command=lambda: [write_data('RE')])
-number_shift = tk.Button(average, text="Shift", font=font_small, command=lambda: [toggle_button(number_shift, shift_var), write_data('SH' + str(shift_var.get()))])
-
-#Grid average, config rows/columns
-avg_type_label.grid(row=0, column=0, sticky='nwes')
-sample_num_label.grid(row=0, column=1, sticky='nwes')
-restart_average.grid(row=1, column=2, rowspan=2, sticky='nwes')
-avg_type_1.grid(row=1, column=0, sticky='nwes')
-avg_type_2.grid(row=2, column=0, sticky='nwes')
-avg_type_3.grid(row=3, column=0, sticky='nwes')
-avg_type_4.grid(row=4, column=0, sticky='nwes')
-sample_num_1.grid(row=1, column=1, sticky='nwes')
-sample_num_2.grid(row=2, column=1, sticky='nwes')
-sample_num_3.grid(row=3, column=1, sticky='nwes')
-sample_num_4.grid(row=4, column=1, sticky='nwes')
-number_shift.grid(row=3, column=2, rowspan=2, sticky='nwes')
-row_col_config(average, rows=[1,1,1,1,1], columns=[2,2,1])
-
-
-#Make frame to put export into
-export = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
-
-#Make needed widgets
-export_label = tk.Label(export, text="Export Data", font=font_small)
-file_name_label = tk.Label(export, text="File Name:", font=font_small)
-file_name = tk.Entry(export, textvariable=file_name_var, font=font_small)
-save_button = tk.Button(export, text="Save", font=font_small, command=lambda :[export_data()])
-clear_button = tk.Button(export, text='Clear', font=font_small, command=lambda :[file_name_var.set('')])
-
-#Grid export, config rows/columns
-export_label.grid(row=0, column=0, columnspan=2, sticky='nwes')
-file_name_label.grid(row=1, column=0, columnspan=2, sticky='nwes')
-file_name.grid(row=2, column=0, columnspan=2, sticky='nwes')
-save_button.grid(row=3, column=0, sticky='nwes')
-clear_button.grid(row=3, column=1, sticky='nwes')
-row_col_config(export, rows=[1,1,1,2], columns=[1,1])
-
-
-#Make misc widgets that arent in a frame
-refresh_display = tk.Button(content, text="Refresh\nDisplay", font=font_small, command=lambda: [refresh_all_display_widgets()])
-preset = tk.Button(content, text="Preset", font=font_small, command=lambda: [write_data('PRSIM2'), preset_values()])
-alphanumerics = tk.Label(content, textvariable=alphanumerics_var, font=font_big, highlightbackground="grey", highlightthickness=2)
-free_run = tk.Button(content, relief=tk.SUNKEN, text="Free Run", font=font_small, command=lambda: [toggle_button(free_run, free_run_var), write_data('FR' + str(free_run_var.get()))])
-repetative = tk.Button(content, relief=tk.SUNKEN, text="Repetative", font=font_small, command=lambda: [toggle_button(repetative, repetative_var), write_data('RP' + str(repetative_var.get()))])
-arm = tk.Button(content, text="Arm", font=font_small, command=lambda: [write_data('AR')])
-
-#Update all display widgets before going to main
-refresh_all_display_widgets()
-
-#Grid everything into content, configure
-display.grid(row=0, column=0, rowspan=14, columnspan=15, sticky='nwes')
-refresh_display.grid(row=14, column=0, rowspan=2, columnspan=2, sticky='nwes')
-preset.grid(row=16, column=0, rowspan=2, columnspan=2, sticky='nwes')
-trace.grid(row=14, column=2, rowspan=4, columnspan=8, sticky='nwes')
-passband.grid(row=14, column=10, rowspan=4, columnspan=5, sticky='nwes')
-alphanumerics.grid(row=0, column=15, rowspan=2, columnspan=17, sticky='nwes')
-sensitivity.grid(row=2, column=15, rowspan=2, columnspan=17, sticky='nwes')
-input_mode.grid(row=4, column=15, rowspan=4, columnspan=12, sticky='nwes')
-scale.grid(row=4, column=27, rowspan=4, columnspan=5, sticky='nwes')
-frequency.grid(row=8, column=15, rowspan=5, columnspan=11, sticky='nwes')
-free_run.grid(row=8, column=26, rowspan=2, columnspan=2, sticky='nwes')
-repetative.grid(row=8, column=28, rowspan=2, columnspan=2, sticky='nwes')
-arm.grid(row=8, column=30, rowspan=2, columnspan=2, sticky='nwes')
-coupling.grid(row=10, column=26, rowspan=3, columnspan=6, sticky='nwes')
-average.grid(row=13, column=15, rowspan=5, columnspan=12, sticky='nwes')
-export.grid(row=13, column=27, rowspan=5, columnspan=5, sticky='nwes')
-row_col_config(content, rows=[1]*14, columns=[1]*15)
-
-#Grid content into root, configure
-content.grid(row=0, column=0, sticky='nwes')
-row_col_config(root, rows=[1], columns=[1])
-
-root.mainloop() #Initiates the main loop for Tkinter
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Aug  7 15:44:19 2025
+
+Generates a virtual control panal for old HP Spectrum Analyzers pre 1990 using tkinter to
+make the GUI, pyvisa to communicate with the SA, matplotlib to generate plots, and numpy to 
+create and export data arrays
+
+@author: Jack Cochrane
+"""
+
+import tkinter as tk
+from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg, NavigationToolbar2Tk)
+from matplotlib.figure import Figure
+import numpy as np
+import time
+import sys
+import os
+import importlib.util
+from pathlib import Path
+from datetime import datetime, timezone
+
+#Loads Imports - Setup.py as the module sa_lib so the panel can share its functions
+#The file name has spaces in it so it cant be imported normally
+if 'sa_lib' in sys.modules:
+    sa_lib = sys.modules['sa_lib']
+else:
+    lib_spec = importlib.util.spec_from_file_location('sa_lib', Path(__file__).with_name('Imports - Setup.py'))
+    sa_lib = importlib.util.module_from_spec(lib_spec)
+    sys.modules['sa_lib'] = sa_lib
+    lib_spec.loader.exec_module(sa_lib)
+
+
+#Called by the im checkboxes to ensure that only two cam be selected at any given time
+def toggle_im_enable ():
+    im_vars_sum=0
+    for x in input_mode_vars:
+        im_vars_sum += x.get()
+    if im_vars_sum >= 2:
+        for x in im_cb:
+            if input_mode_vars[im_cb.index(x)].get() == 0:
+                x['state'] = tk.DISABLED
+            else:
+                x['state'] = tk.NORMAL
+    else:
+        for x in im_cb:
+            x['state'] = tk.NORMAL
+
+#Allows for one line configuration of tkinter row/column weight
+def row_col_config (to_grid, rows, columns):
+    rows = enumerate(rows)
+    columns = enumerate(columns)
+    for x, y in rows:
+        to_grid.rowconfigure(x, weight=y)
+    for x, y in columns:
+        to_grid.columnconfigure(x, weight=y)
+
+#Called by buttons/menus to write commands to the spectrum analyzer
+#Commands wait flush_delay ms for more to come in, then everything waiting is sent in one write
+def write_data (command):
+    global flush_timer
+    command_scheduler.add(command)
+    if flush_timer is not None:
+        root.after_cancel(flush_timer)
+    flush_timer = root.after(flush_delay, flush_commands)
+
+#Sends the commands waiting in command_scheduler as one write, while offline they wait until the SA is connected
+def flush_commands ():
+    global flush_timer
+    if flush_timer is not None:
+        root.after_cancel(flush_timer)
+        flush_timer = None
+    if not connected:
+        return
+    command = command_scheduler.flush()
+    if command != '':
+        worker.submit(sa_lib.send, command, error=report_error)
+
+#Gives the worker a request, waiting commands are sent first so the request sees them
+#Returns the Future of the request, or None if the SA isnt connected
+def submit_request (function, *args, callback = None, error = None):
+    if not connected:
+        return None
+    flush_commands()
+    return worker.submit(function, *args, callback=callback, error=error)
+
+#Reports an error from a request that has no callback to raise it, tkinter shows it like an error from a button
+def report_error (error):
+    raise error
+
+#Delivers finished work from the worker, tkinter can only be used from the main thread
+def poll_worker ():
+    root.after(20, poll_worker)
+    worker.deliver()
+    update_live()
+
+#refreshes alphanumerics, called by refresh_all_display_widgets
+def refresh_alphanumerics ():
+    submit_request(lambda SA: SA.query('LAN'), callback=show_alphanumerics)
+
+#Puts the alphanumerics read by the worker on the display
+def show_alphanumerics (val):
+    val = val.replace('*', '°')
+    val = val[0:32] + '\n' + val[32:64] + '\n' + val[64:96] + '\n' + val[96:128]
+    alphanumerics_var.set(val)
+
+#refreshes both overloads, called by refresh_all_display widgets
+def refresh_overload ():
+    submit_request(read_overload, callback=show_overload)
+
+#Reads the status word and transfer sensitivity, runs on the worker thread
+def read_overload (SA):
+    SA.write('LST0')
+    SA.write('LST1')
+    status_word = SA.read_bytes(1)
+    return status_word, SA.query('LXS')
+
+#Puts the overloads and transfer sensitivity read by the worker on the display
+def show_overload (result):
+    status_word, transfer_sens = result
+    if (int.from_bytes(status_word)&4)==4:
+        A_overload_var.set('Overload')
+    else:
+        A_overload_var.set('Normal')
+    if (int.from_bytes(status_word)&8)==8:
+        B_overload_var.set('Overload')
+    else:
+        B_overload_var.set('Normal')
+    transfer_sens_var.set(transfer_sens + 'dBV')
+
+#Makes the Input Mode list
+def make_im_list ():
+    im_list =['A Amplitude', 'A Phase', 'B Amplitude', 'B Phase', 'Transfer Amplitude', 'Transfer Phase', 'Coherance']
+    if y_scale_var.get() == 1:
+        amp_type = ''
+    else:
+        amp_type = 'dB'
+    im_data_types = [amp_type + 'V', 'Deg', amp_type + 'V', 'Deg', amp_type, 'Deg', '']
+    im_list = list(zip(im_list, input_mode_vars, im_data_types))
+    return im_list
+
+#Gets the vars needed to read and plot the display, tkinter vars cant be read from the worker thread
+def get_display_request ():
+    im_list = make_im_list() #element tuple (name, on/off, datatype)
+    selected = []
+    for x in im_list:
+        if x[1].get() == 1:
+            selected.append(x)
+    freq_settings = (frequency_mode_var.get(), adjust_var.get(), span_var.get())
+    
+    #The key is everything that changes the units of the display, it is used to calibrate the binary transfer
+    key = (tuple(x.get() for x in input_mode_vars), y_scale_var.get(), ref_level_var.get(), A_sens_var.get(), B_sens_var.get())
+    return key, selected, freq_settings
+
+#refreshes/generates the figure/plots and toolbar, returns the Future of the read
+def refresh_figure_toolbar ():
+    key, selected, freq_settings = get_display_request()
+    return submit_request(sa_lib.read_display, transfer_mode, key, callback=lambda values: [push_waterfall(values, selected, freq_settings), show_traces(values, selected, freq_settings)])
+
+#Turns live mode on and off, live mode reads the display back to back into trace_ring
+def toggle_live ():
+    global live_request, live_generation
+    toggle_button(live, live_var)
+    live_request = get_display_request()
+    live_generation += 1 #Stops a read chain that is still going from a previous time live was on
+    if live_var.get() == 1:
+        submit_request(live_read, live_generation, error=stop_live)
+
+#Turns live mode off after a read in it failed, and reports why
+def stop_live (error):
+    global live_generation
+    live_generation += 1
+    if live_var.get() == 1:
+        toggle_button(live, live_var)
+    report_error(error)
+
+#Reads the display into trace_ring while live mode is on, runs on the worker thread
+#Each read puts the next one at the back of the queue, so commands from the buttons still get sent in between
+def live_read (SA, generation):
+    if generation != live_generation:
+        return
+    request = live_request
+    values = sa_lib.read_display(SA, transfer_mode, request[0])
+    trace_ring.push(values, request)
+    push_waterfall(values, request[1], request[2]) #Every trace goes into the waterfall even when the display skips some
+    worker.submit(live_read, generation, error=stop_live)
+
+#Adds the top trace of a display read to the waterfall, a change of trace or frequency settings starts the waterfall again
+#Can be called from the worker thread, waterfall_buffer has its own lock
+def push_waterfall (values, selected, freq_settings):
+    if len(selected) == 0:
+        return
+    trace_values = np.split(values, 2)[0] if len(selected) >= 2 else values
+    waterfall_buffer.push(trace_values, (selected[0][0], freq_settings))
+
+#Redraws the newest trace in live mode, no more than live_frame_rate times a second
+def update_live ():
+    global live_request, live_drawn, live_draw_time
+    if live_var.get() == 0:
+        return
+    live_request = get_display_request() #Picks up changes to the settings for the next read
+    if trace_ring.count == live_drawn or time.perf_counter() - live_draw_time < 1 / live_frame_rate:
+        return
+    live_drawn = trace_ring.count
+    live_draw_time = time.perf_counter()
+    values, request = trace_ring.latest()
+    show_traces(values, request[1], request[2])
+
+#Puts the trace read by the worker into figure_vars, makes the frequency array, and redraws
+def show_traces (values, selected, freq_settings):
+    #Make and set two vars flag
+    global two_vars
+    two_vars = len(selected) >= 2
+    
+    #Split value array as needed, add to list, zip into figure_vars, need to confirm that ordering is correct
+    if two_vars:
+         values = np.split(values, 2)
+    else:
+        values = [values]
+    global figure_vars
+    figure_vars = list(zip(selected, values))  #element tuple ((name, on/off, datatype,) data array)
+    global trace_time
+    trace_time = datetime.now(timezone.utc).astimezone() #Saved with the traces by export_data
+    
+    #generate the frequency array
+    frequency_mode, adjust, span = freq_settings
+    global freq_vals
+    freq_vals = sa_lib.frequency_axis(frequency_mode, adjust, span_list.index(span) + 1, values[0].size) #Shared and read only, the same settings give back the same array
+    figure_vars = list(enumerate(figure_vars)) #element tuple (index, ((name, on/off, datatype,) data array))
+    
+    redraw_display ()
+
+#Opens the session and sets up the SA, runs on the worker thread so the window is up and usable while it connects
+#Returns None once connected, or why it couldnt connect
+def connect_instrument (SA):
+    try:
+        session.close() #Starts from nothing if a connection was half made before
+        session.open()
+        worker.SA = session.SA
+        session.SA.write('PRS')
+        sa_lib.wait_ready(session.SA, 0, 0.1)
+        session.SA.write('IM2')
+        sa_lib.wait_ready(session.SA, 0, 0.1)
+    except Exception as error: #Anything from no VISA library to nothing answering on the bus
+        session.close()
+        worker.SA = None
+        return str(error) or type(error).__name__
+    return None
+
+#Starts connecting to the SA in the background, show_connection is called when it is done
+def connect ():
+    global connection
+    show_alphanumerics('CONNECTING TO ' + session.resource_name)
+    refresh_display_var.set('Refresh\nDisplay')
+    connection = worker.submit(connect_instrument, callback=show_connection)
+
+#Fills in the display widgets once connected, or shows the panel as offline with the refresh button changed to retry
+def show_connection (error):
+    global connected
+    connected = error is None
+    if connected:
+        refresh_all_display_widgets() #Commands from while it was connecting are sent first
+    else:
+        show_alphanumerics(('OFFLINE, ' + session.resource_name).ljust(32) + error.upper())
+        refresh_display_var.set('Retry\nConnect')
+
+#Refreshes the display, or tries to connect again if offline
+#Forgets the mirrored settings first in case the knobs on the SA were used
+def refresh_or_retry ():
+    if connected:
+        submit_request(lambda SA: session.state.invalidate())
+        refresh_all_display_widgets()
+    elif connection.done(): #Not while it is still trying
+        connect()
+
+#Generates plot, alphanumerics, and overload once connected and on pressing refresh
+def refresh_all_display_widgets ():
+    refresh_alphanumerics()
+    refresh_overload()
+    refresh_figure_toolbar()
+
+#Automatially sets the sensitivity to a value that it doesnt immediately overload
+def set_sensitivity ():
+    #Turn off average
+    avg_type_var.set(1)
+    triggering = (free_run_var.get(), repetative_var.get())
+    return submit_request(find_sensitivity, (frequency_mode_var.get(), adjust_var.get(), span_var.get()), triggering, callback=show_sensitivity)
+
+#Turns off average and bisects both sensitivities, starting from the ones last found at this frequency setting
+#autorange waits for time records, so free run and repetitive are turned on for it and put back to triggering (free run, repetitive) after
+#Runs on the worker thread
+def find_sensitivity (SA, key, triggering):
+    SA.write('AV1FR1RP1')
+    try:
+        AS, BS = sa_lib.autorange(SA, key)
+    finally:
+        SA.write('FR' + str(triggering[0]) + 'RP' + str(triggering[1]))
+    return AS, BS, SA.query('LXS')
+
+#Puts the sensitivities found by the worker on the display
+def show_sensitivity (result):
+    AS, BS, transfer_sens = result
+    A_sens_var.set(sens_list[AS-1])
+    B_sens_var.set(sens_list[BS-1])
+    transfer_sens_var.set(transfer_sens + 'dBV')
+    refresh_overload()
+
+#Resets display vars to match prs
+def preset_values ():
+    trace_1.set(0)
+    trace_2.set(0)
+    passband_var.set(1)
+    A_sens_var.set(sens_list[1])
+    B_sens_var.set(sens_list[1])
+    submit_request(lambda SA: SA.query('LXS'), callback=lambda val: transfer_sens_var.set(val + 'dBV'))
+    #A_amplitude, A_phase, B_amplitude, B_phase, transfer_amplitude, transfer_phase, coherance
+    input_mode_vars[0].set(1)
+    input_mode_vars[1].set(0)
+    input_mode_vars[2].set(0)
+    input_mode_vars[3].set(0)
+    input_mode_vars[4].set(0)
+    input_mode_vars[5].set(0)
+    input_mode_vars[6].set(0)
+    x_scale_var.set(0)
+    y_scale_var.set(2)
+    frequency_mode_var.set(1)
+    span_var.set(span_list[13])
+    adjust_var.set(0)
+    A_coupling_var.set(1)
+    B_coupling_var.set(1)
+    avg_type_var.set(1)
+    sample_num_var.set(1)
+    shift_var.set(0)
+    free_run_var.set(1)
+    repetative_var.set(1)
+    refresh_alphanumerics()
+    ref_level_var.set(1)
+    toggle_im_enable ()
+    recall_trace_1.configure(relief=tk.RAISED)
+    recall_trace_2.configure(relief=tk.RAISED)
+    free_run.configure(relief=tk.SUNKEN)
+    repetative.configure(relief=tk.SUNKEN)
+    number_shift.configure(relief=tk.RAISED)
+
+#Makes the axes, lines, cursors, and legends, only called when the layout of the display changes
+#layout is (number of axes, x scale, waterfall on)
+def build_display (layout):
+    global display_layout, plot_axes, plot_lines, peak_marks, cursor_vlines, cursor_hlines, cursor_legends, waterfall_axes, waterfall_image
+    fig.clf()
+    display_layout = layout
+    axes = list(np.atleast_1d(fig.subplots(layout[0] + layout[2], sharex=True)))
+    plot_axes = axes[0:layout[0]]
+    
+    #The waterfall is one image under the traces, it is only given new data after this
+    waterfall_axes, waterfall_image = None, None
+    if layout[2] == 1:
+        waterfall_axes = axes[-1]
+        waterfall_image = waterfall_axes.imshow(np.zeros((1, 1)), aspect='auto', origin='lower', interpolation='nearest')
+        waterfall_axes.set_ylabel('Time (s)')
+        waterfall_axes.set_xlabel('Frequency (Hz)')
+    
+    #The cursors are animated so they are left out of full draws and can be blitted on their own
+    plot_lines, peak_marks, cursor_vlines, cursor_hlines, cursor_legends = [], [], [], [], []
+    for ax in plot_axes:
+        if layout[1] == 1:
+            ax.set_xscale('log')
+        plot_lines.append(ax.plot([], [], '-')[0])
+        peak_marks.append(ax.plot([], [], 'v', color='red')[0])
+        ax.set_xlabel('Frequency (Hz)')
+        ax.grid(which='both')
+        cursor_vlines.append(ax.axvline(x=1, color=cursor_color, lw=1, animated=True))
+        cursor_hlines.append(ax.axhline(y=0, color=cursor_color, lw=1, animated=True))
+        cursor_legends.append(ax.legend(handles=[cursor_vlines[-1]], labels=[' ']))
+        cursor_legends[-1].set_animated(True)
+
+#Toggles the display of data points, also used to refresh the display without changing data
+#Only rebuilds the axes when the layout changes, otherwise the existing lines are given the new data
+def redraw_display (*args):
+    layout = (2 if two_vars else 1, x_scale_var.get(), waterfall_var.get())
+    if layout != display_layout:
+        build_display(layout)
+    
+    if data_points_var.get():
+        marker = '2'
+    else:
+        marker = ''
+    for i, x in figure_vars:
+        plot_lines[i].set_data(freq_vals, x[1])
+        plot_lines[i].set_marker(marker)
+        plot_axes[i].set_title(x[0][0])
+        plot_axes[i].set_ylabel(x[0][2])
+    update_markers()
+    update_waterfall()
+    update_cursors() #Before relim so the cursors are inside the data when the limits are found
+    for i, x in figure_vars:
+        plot_axes[i].relim()
+        plot_axes[i].autoscale_view()
+    
+    passband_list = ['error', 'Flattop', 'Hanning', 'Uniform']
+    fig.suptitle(t=('Passband Shape: '+ passband_list[passband_var.get()]), size='medium', ha='left', va='bottom', x=0.02, y=0.02)
+    data_display.draw_idle()
+
+#Finds the peaks, harmonics, noise floor, and power of every amplitude trace on the display, marks the peaks, and fills in the marker table
+#Runs on every redraw so the markers follow live mode
+def update_markers ():
+    table = []
+    for i, x in figure_vars:
+        name, units = x[0][0], x[0][2]
+        if markers_var.get() == 0 or units == 'Deg':
+            peak_marks[i].set_data([], [])
+            continue
+        markers = sa_lib.find_markers(freq_vals, x[1], count=marker_count, dB=y_scale_var.get() != 1, passband=passband_var.get())
+        peak_marks[i].set_data(*markers['peaks'])
+        peaks = ', '.join("%.2fHz %.2f%s" % (f, h, units) for f, h in zip(*markers['peaks']))
+        harmonics = ', '.join("%d: %.2fHz %.2f%s" % (n, f, h, units) for n, f, h in zip(*markers['harmonics']))
+        line = name + ' | Peaks: ' + peaks + ' | Harmonics: ' + harmonics + ' | Noise floor: ' + "%.2f%s" % (markers['noise_floor'], units)
+        if 'V' in units: #The power only means something for the A and B amplitudes
+            line += ' | Power: ' + "%.2f%s" % (markers['power'], units)
+        table.append(line)
+    marker_table_var.set('\n'.join(table))
+
+#Gives the waterfall image the traces in waterfall_buffer, with no more rows than the waterfall is pixels high
+#Time is in seconds before the newest trace
+def update_waterfall ():
+    if waterfall_image is None:
+        return
+    rows = max(int(waterfall_axes.get_window_extent().height), 1)
+    image, times = waterfall_buffer.image(rows)
+    if image.shape[0] == 0 or image.shape[1] != freq_vals.size:
+        return
+    waterfall_image.set_data(image)
+    waterfall_image.set_extent((freq_vals[0], freq_vals[-1], min(times[0] - times[-1], -1e-3), 0)) #Never zero high, even with one trace
+    waterfall_image.set_clim(np.nanmin(image), np.nanmax(image))
+
+#Moves the cursor lines and legends to the slider and shows/hides them
+def update_cursors ():
+    index = display_slider_var.get()
+    for i, x in figure_vars:
+        label = str("%.2f" % freq_vals[index]) + 'Hz, ' + str("%.2f" % x[1][index]) + x[0][2]
+        cursor_vlines[i].set_xdata([freq_vals[index], freq_vals[index]])
+        cursor_hlines[i].set_ydata([x[1][index], x[1][index]])
+        cursor_legends[i].get_texts()[0].set_text(label)
+        for artist in (cursor_vlines[i], cursor_hlines[i], cursor_legends[i]):
+            artist.set_visible(display_toggle_on.get())
+
+#Draws the cursors on top of whatever has been drawn
+def draw_cursors ():
+    for i, x in figure_vars:
+        for artist in (cursor_vlines[i], cursor_hlines[i], cursor_legends[i]):
+            plot_axes[i].draw_artist(artist)
+
+#Saves the display without the cursors after every full draw so the cursors can be blitted over it
+def save_background (event):
+    global display_background
+    display_background = data_display.copy_from_bbox(fig.bbox)
+    draw_cursors()
+
+#Called by the cursor slider, only the cursors are redrawn over the saved background instead of the whole figure
+def move_cursor (*args):
+    if display_background is None:
+        return
+    update_cursors()
+    data_display.restore_region(display_background)
+    draw_cursors()
+    data_display.blit(fig.bbox)
+
+#Exports/saves data, the traces on the display and the panel's settings are added to a capture file in SA_data
+#With CSV checked they are also saved as a csv like before
+def export_data ():
+    #figure_vars element tuple (index, ((name, on/off, datatype,) data array))
+    now = datetime.now(timezone.utc).astimezone()
+    if file_name_var.get() == '' or file_name_var.get().isspace():
+        export_name = 'SA_data/captures_' + now.strftime("%Y-%m-%d") #One capture file a day
+        csv_name = 'SA_data/data_set_' + now.strftime("%Y-%m-%d_T%H-%M-%S") + '.csv'
+    else:
+        export_name = 'SA_data/' + file_name_var.get()
+        csv_name = export_name + '.csv'
+    
+    columns = [freq_vals] + [x[1][1] for x in figure_vars]
+    names = ['Frequency (Hz)'] + [x[1][0][0] + ' ' + x[1][0][2] for x in figure_vars]
+    settings = {'frequency_mode': frequency_mode_var.get(), 'adjust': adjust_var.get(), 'span': span_var.get(), 'passband': passband_var.get(),
+                'A_sensitivity': A_sens_var.get(), 'B_sensitivity': B_sens_var.get(), 'transfer_sensitivity': transfer_sens_var.get(),
+                'A_coupling': A_coupling_var.get(), 'B_coupling': B_coupling_var.get(), 'average': avg_type_var.get(), 'samples': sample_num_var.get(),
+                'reference_level': ref_level_var.get(), 'y_scale': y_scale_var.get(), 'transfer': transfer_mode}
+    sa_lib.append_capture(export_name + '.sacap', columns, names, settings, trace_time)
+    
+    if export_csv_var.get() == 1:
+        np.savetxt(csv_name, np.transpose(columns), header=','.join(names), delimiter=',', comments='')
+
+#Allows normal buttons to be used as checkboxes
+def toggle_button (button, button_var):
+    if button_var.get() == 1:
+        button.configure(relief=tk.RAISED)
+        button_var.set(0)
+    else:
+        button.configure(relief=tk.SUNKEN)
+        button_var.set(1)
+
+#Toggles the cursor slider on and off
+def dis_slider_toggle ():
+    if display_toggle_on.get() == 1:
+        display_toggle.configure(relief=tk.RAISED)
+        display_toggle_on.set(0)
+    else:
+        display_toggle.configure(relief=tk.SUNKEN)
+        display_toggle_on.set(1)
+    move_cursor()
+
+#Sends any waiting commands, stops the worker, saves the bus trace if dump_trace is on, and closes the session
+def close_panel ():
+    flush_commands()
+    worker.stop()
+    if dump_trace and session.SA is not None:
+        session.SA.print_summary()
+        session.SA.dump('SA_data/trace_' + datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d_T%H-%M-%S") + '.csv')
+    session.close()
+    root.destroy()
+
+
+#Create data storage folders if they do not exist already
+path_string = "SA_data"
+path = Path(path_string)
+path.mkdir(parents=False, exist_ok=True)
+
+#One session with the spectrum analyzer(SA) that the whole panel uses until the window is closed, it is opened by connect
+simulate = os.environ.get('SA_SIMULATE', '0') == '1' #Uses the simulated SA from SA Simulator.py, for when there is no analyzer on the bus
+dump_trace = os.environ.get('SA_TRACE', '0') == '1' #Prints the bus latencies and saves every call to SA_data when the window is closed
+resource_name = os.environ.get('SA_RESOURCE', 'GPIB::11') #Which analyzer the panel controls, so a panel can be opened for each one
+session = sa_lib.SASession(resource_name, simulate=simulate)
+connected = False
+connection = None #Future of the last connect
+
+#Makes the worker thread that does the talking to the SA, connect_instrument gives it the SA
+worker = sa_lib.InstrumentWorker()
+
+#Makes the object root which is the base object of the window
+root = tk.Tk()
+root.wm_title("HP3582A Spectrum Analyzer")
+
+
+#Make a master frame to store all of the content
+content = tk.Frame(root)
+
+#Initialize the variables
+trace_1 = tk.IntVar(value=0)
+trace_2 = tk.IntVar(value=0)
+passband_var = tk.IntVar(value=1)
+sens_list = ['CAL', '30 V, + 30 dBV', '10 V, +20 dBV', '3 V, +10 dBV', '1 V, +0 dBV', '.3 V, -10 dBV', '.1 V, -20 dBV', '30 mV, -30 dBV', '10 mV, -40 dBV', '3 mV,-50 dBV']
+A_sens_var = tk.StringVar(value=sens_list[1])
+B_sens_var = tk.StringVar(value=sens_list[1])
+transfer_sens_var = tk.StringVar(value='')
+A_overload_var = tk.StringVar(value='Normal')
+B_overload_var = tk.StringVar(value='Normal')
+#A_amplitude, A_phase, B_amplitude, B_phase, transfer_amplitude, transfer_phase, coherance
+input_mode_vars = [tk.IntVar(value=1), tk.IntVar(value=0), tk.IntVar(value=0), tk.IntVar(value=0), tk.IntVar(value=0), tk.IntVar(value=0), tk.IntVar(value=0)]
+x_scale_var = tk.IntVar(value=0)
+y_scale_var = tk.IntVar(value=2)
+frequency_mode_var = tk.IntVar(value=1)
+span_list = ['1Hz', '2.5Hz', '5Hz', '10Hz', '25Hz', '50Hz', '100Hz', '250Hz', '500Hz', '1kHz', '2.5kHz', '5kHz', '10kHz', '25kHz']
+span_var = tk.StringVar(value=span_list[13])
+adjust_var = tk.IntVar(value=0)
+A_coupling_var = tk.IntVar(value=1)
+B_coupling_var = tk.IntVar(value=1)
+avg_type_var = tk.IntVar(value=1)
+sample_num_var = tk.IntVar(value=1)
+shift_var = tk.IntVar(value=0)
+free_run_var = tk.IntVar(value=1)
+repetative_var = tk.IntVar(value=1)
+alphanumerics_var = tk.StringVar(value='')
+refresh_display_var = tk.StringVar(value='Refresh\nDisplay')
+data_points_var = tk.BooleanVar(value=False)
+ref_level_var = tk.IntVar(value=1)
+file_name_var = tk.StringVar(value='')
+export_csv_var = tk.IntVar(value=0)
+font_small = ("Arial", 12)
+font_big = ("Arial", 18)
+display_slider_var = tk.IntVar(value=0)
+display_toggle_on = tk.BooleanVar(value=False)
+display_toggle_var = tk.StringVar(value='Toggle\nCursor')
+markers_var = tk.IntVar(value=0)
+marker_count = 5 #Peaks and harmonics shown in the marker table
+marker_table_var = tk.StringVar(value='')
+waterfall_var = tk.IntVar(value=0)
+waterfall_buffer = sa_lib.WaterfallBuffer(capacity=2000) #Last 2000 traces of the top trace, about 4 MB
+waterfall_axes = None #Set by build_display
+waterfall_image = None
+cursor_color = 'black'
+two_vars = False
+figure_vars = [] #Filled in by show_traces once the worker has read the display
+freq_vals = np.zeros(0)
+trace_time = None
+live_var = tk.IntVar(value=0)
+live_frame_rate = 10 #Most times a second the display is redrawn in live mode
+trace_ring = sa_lib.TraceRingBuffer(capacity=100) #Last 100 traces read in live mode
+live_request = None
+live_generation = 0
+live_drawn = 0
+live_draw_time = 0
+command_scheduler = sa_lib.CommandScheduler()
+flush_delay = 100 #ms to wait for more commands before sending
+flush_timer = None
+transfer_mode = 'ascii' #'ascii' reads the display with LDS, 'binary' reads the display memory and decodes it with numpy
+
+#Make a frame to put the display into
+display = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Create the data display
+fig = Figure(figsize=(5, 4), dpi=100)
+data_display = FigureCanvasTkAgg(fig, master=display)  #Initializes the figure as a tk canvas
+data_display.mpl_connect('draw_event', save_background)
+display_layout = None #Set by build_display
+display_background = None #Set by save_background
+
+#create the data display toolbar
+tool_bar = NavigationToolbar2Tk(data_display, display, pack_toolbar=False)
+tool_bar.update()
+
+#create the other widgets
+display_slider_label = tk.Label(display, text='Cursor', font=font_small)
+display_slider = tk.Scale(display, from_=0, to=127, variable=display_slider_var, orient=tk.HORIZONTAL, resolution=1, showvalue=0, command=move_cursor)
+display_toggle = tk.Button(display, relief=tk.RAISED, font=font_small, textvariable=display_toggle_var, command=dis_slider_toggle)
+live = tk.Button(display, relief=tk.RAISED, text='Live', font=font_small, command=toggle_live)
+markers_button = tk.Button(display, relief=tk.RAISED, text='Markers', font=font_small, command=lambda: [toggle_button(markers_button, markers_var), redraw_display()])
+waterfall_button = tk.Button(display, relief=tk.RAISED, text='Waterfall', font=font_small, command=lambda: [toggle_button(waterfall_button, waterfall_var), redraw_display()])
+
+#grid display
+tool_bar.grid(row=13, column=0, rowspan=2, columnspan=11, sticky='nwes')
+waterfall_button.grid(row=13, column=11, rowspan=2, sticky='nwes')
+markers_button.grid(row=13, column=12, rowspan=2, sticky='nwes')
+live.grid(row=13, column=13, rowspan=2, sticky='nwes')
+data_display.get_tk_widget().grid(row=0, column=0, columnspan=15, rowspan=12, sticky='nwes')
+display_slider_label.grid(row=12, column=0, sticky='nwes')
+display_slider.grid(row=12, column=1, columnspan=13, sticky='we')
+display_toggle.grid(row=12, column=14, rowspan=3, sticky='nwes')
+row_col_config(display, rows=[1]*12, columns=[1]*15)
+
+#Make a frame to put the trace buttons in
+trace = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Make the buttons to put into trace
+store_trace_1 = tk.Button(trace, text="Store Trace 1", font=font_small, command=lambda: [write_data('TS')])
+store_trace_2 = tk.Button(trace, text="Store Trace 2", font=font_small, command=lambda: [write_data('RS')])
+recall_trace_1 = tk.Button(trace, text="Recall Trace 1", font=font_small, relief=tk.RAISED, command=lambda: [toggle_button(recall_trace_1, trace_1), write_data('TR'+str(trace_1.get()))])
+recall_trace_2 = tk.Button(trace, text="Recall Trace 2", font=font_small, relief=tk.RAISED, command=lambda: [toggle_button(recall_trace_2, trace_2), write_data('RR'+str(trace_2.get()))])
+
+#grid trace, configure rows/columns
+store_trace_1.grid(row=0, column=0, sticky='nwes')
+store_trace_2.grid(row=0, column=1, sticky='nwes')
+recall_trace_1.grid(row=1, column=0, sticky='nwes')
+recall_trace_2.grid(row=1, column=1, sticky='nwes')
+row_col_config(trace, rows=[1, 1], columns=[1, 1])
+
+
+#Make a frame to put passband radiobuttons in, define the intVar for passband
+passband = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Make the lable and buttons to put in the frame
+passband_label = tk.Label(passband, text="Passband Shape", font=font_small)
+flattop = tk.Radiobutton(passband, text="Flattop", variable=passband_var, value=1, font=font_small, command=lambda: [write_data('PS'+str(passband_var.get())), refresh_all_display_widgets()])
+hanning = tk.Radiobutton(passband, text="Hanning", variable=passband_var, value=2, font=font_small, command=lambda: [write_data('PS'+str(passband_var.get())), refresh_all_display_widgets()])
+uniform = tk.Radiobutton(passband, text="Uniform", variable=passband_var, value=3, font=font_small, command=lambda: [write_data('PS'+str(passband_var.get())), refresh_all_display_widgets()])
+
+#grid passband, configure rows/col
+passband_label.grid(row=0, column=0, sticky='nwes')
+flattop.grid(row=1, column=0, sticky='nwes')
+hanning.grid(row=2, column=0, sticky='nwes')
+uniform.grid(row=3, column=0, sticky='nwes')
+row_col_config(passband, rows=[1,1,1,1], columns=[1])
+
+
+#Make a frame to put sensetivity widgets in, define nessesary variables
+sensitivity = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Make the OptionMenus, Overload Indecators, Transfer Sensitivity, AutoSense Button, and labels
+A_sens = tk.OptionMenu(sensitivity, A_sens_var, *sens_list, command=lambda x: [write_data(('AS' + str(sens_list.index(A_sens_var.get())+1))), refresh_overload()])
+B_sens = tk.OptionMenu(sensitivity, B_sens_var, *sens_list, command=lambda x: [write_data(('BS' + str(sens_list.index(B_sens_var.get())+1))), refresh_overload()])
+transfer_sens = tk.Label(sensitivity, textvariable = transfer_sens_var, font=font_small, highlightbackground="grey", highlightthickness=1)
+auto_sens = tk.Button(sensitivity, text="Auto Sensitivity", font=font_small, command=set_sensitivity)
+A_sens_label = tk.Label(sensitivity, text="A Sensitivity", font=font_small, highlightbackground="grey", highlightthickness=1)
+B_sens_label = tk.Label(sensitivity, text="B Sensitivity", font=font_small, highlightbackground="grey", highlightthickness=1)
+transfer_sens_label = tk.Label(sensitivity, text="Transfer Sensitivity", font=font_small, highlightbackground="grey", highlightthickness=1)
+A_overload_label = tk.Label(sensitivity, text="A Overload", font=font_small, highlightbackground="grey", highlightthickness=1)
+B_overload_label = tk.Label(sensitivity, text="B Overload", font=font_small, highlightbackground="grey", highlightthickness=1)
+A_overload = tk.Label(sensitivity, textvariable=A_overload_var, font=font_small, highlightbackground="grey", highlightthickness=1)
+B_overload = tk.Label(sensitivity, textvariable=B_overload_var, font=font_small, highlightbackground="grey", highlightthickness=1)
+
+#grid sensitivity, congigure rows/comlumns
+A_sens_label.grid(row=0, column=0, sticky='nwes')
+A_sens.grid(row=1, column=0, sticky='nwes')
+A_overload_label.grid(row=0, column=1, sticky='nwes')
+A_overload.grid(row=1, column=1, sticky='nwes')
+B_sens_label.grid(row=0, column=2, sticky='nwes')
+B_sens.grid(row=1, column=2, sticky='nwes')
+B_overload_label.grid(row=0,column=3, sticky='nwes')
+B_overload.grid(row=1, column=3, sticky='nwes')
+transfer_sens_label.grid(row=0, column=4, sticky='nwes')
+transfer_sens.grid(row=1, column=4, sticky='nwes')
+auto_sens.grid(row=0, rowspan=2, column=5, sticky='nwes')
+row_col_config(sensitivity, rows=[1,1], columns=[4,2,4,2,4,2])
+
+
+#make a frame to put input mode widgets in and to define checkbutton variables and function
+input_mode = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Make the needed widgets, add checkboxes to a list to allow for ease of use in enable function
+im_label = tk.Label(input_mode, text="Input Mode", font=font_small)
+im_amp_label = tk.Label(input_mode, text="Amplitude:", font=font_small)
+im_phase_label = tk.Label(input_mode, text="Phase:", font=font_small)
+A_amplitude = tk.Checkbutton(input_mode, text="A", font=font_small, variable=input_mode_vars[0], command=lambda: [toggle_im_enable(), write_data('AA'+str(input_mode_vars[0].get()))])
+A_phase = tk.Checkbutton(input_mode, text="A", font=font_small, variable=input_mode_vars[1], command=lambda: [toggle_im_enable(), write_data('PA'+str(input_mode_vars[1].get()))])
+B_amplitude = tk.Checkbutton(input_mode, text="B", font=font_small, variable=input_mode_vars[2], command=lambda: [toggle_im_enable(), write_data('AB'+str(input_mode_vars[2].get()))])
+B_phase = tk.Checkbutton(input_mode, text="B", font=font_small, variable=input_mode_vars[3], command=lambda: [toggle_im_enable(), write_data('PB'+str(input_mode_vars[3].get()))])
+transfer_amplitude = tk.Checkbutton(input_mode, text="Transfer", font=font_small, variable=input_mode_vars[4], command=lambda: [toggle_im_enable(), write_data('AX'+str(input_mode_vars[4].get()))])
+transfer_phase = tk.Checkbutton(input_mode, text="Transfer", font=font_small, variable=input_mode_vars[5], command=lambda: [toggle_im_enable(), write_data('PX'+str(input_mode_vars[5].get()))])
+coherance = tk.Checkbutton(input_mode, text="Coherance", font=font_small, variable=input_mode_vars[6], command=lambda: [toggle_im_enable(), write_data('CH'+str(input_mode_vars[6].get()))])
+im_cb = [A_amplitude, A_phase, B_amplitude, B_phase, transfer_amplitude, transfer_phase, coherance]
+
+#Grid input mode, configure rows/colums 
+im_label.grid(row=0, column=0, columnspan=1, sticky='nwes')
+im_amp_label.grid(row=1, column=0, sticky='nwes')
+im_phase_label.grid(row=2, column=0, sticky='nwes')
+A_amplitude.grid(row=1, column=1, sticky='nwes')
+B_amplitude.grid(row=1, column=2, sticky='nwes')
+transfer_amplitude.grid(row=1, column=3, sticky='nwes')
+coherance.grid(row=0, column=3, sticky='nwes')
+A_phase.grid(row=2, column=1, sticky='nwes')
+B_phase.grid(row=2, column=2, sticky='nwes')
+transfer_phase.grid(row=2, column=3, sticky='nwes')
+row_col_config(input_mode, rows=[1,1,1], columns=[1,1,1,1])
+
+
+#Make a frame to put the scale in, and define needed variables
+scale = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Make the needed widgets
+x_scale_label = tk.Label(scale, text = "X Scale", font=font_small)
+y_scale_label = tk.Label(scale, text = "Y Scale", font=font_small)
+y_scale_lin = tk.Radiobutton(scale, text= "Linear", variable=y_scale_var, value=1, font=font_small, command=lambda: [write_data('SC' + str(y_scale_var.get()))])
+y_scale_10dB = tk.Radiobutton(scale, text="10dB/DIV", variable=y_scale_var, value=2, font=font_small, command=lambda: [write_data('SC' + str(y_scale_var.get()))])
+y_scale_20dB = tk.Radiobutton(scale, text="20dB/DIV", variable=y_scale_var, value=3, font=font_small, command=lambda: [write_data('SC' + str(y_scale_var.get()))])
+x_scale_lin = tk.Radiobutton(scale, text="Linear", variable=x_scale_var, value=0, font=font_small, command=redraw_display)
+x_scale_log = tk.Radiobutton(scale, text="Log", variable=x_scale_var, value=1, font=font_small, command=redraw_display)
+data_points = tk.Button(scale, text ="Show Datapoints", relief=tk.RAISED, font=font_small, command=lambda: [toggle_button(data_points, data_points_var), redraw_display()])
+
+
+#Grid scale, configure rows/cols
+y_scale_label.grid(row=0, column=0, sticky='nwes')
+x_scale_label.grid(row=0, column=1, sticky='nwes')
+y_scale_lin.grid(row=1, column=0, sticky='nwes')
+x_scale_lin.grid(row=1, column=1, sticky='nwes')
+y_scale_10dB.grid(row=2, column=0, sticky='nwes')
+x_scale_log.grid(row=2, column=1, sticky='nwes')
+y_scale_20dB.grid(row=3, column=0, sticky='nwes')
+data_points.grid(row=3, column=1, sticky='nwes')
+row_col_config(scale, rows=[1,1,1], columns=[1,1])
+
+
+#Make a frame to put frequency in, and define needed variables
+frequency = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Make the needed widgets
+frequency_mode_label = tk.Label(frequency, text="Frequency Mode", font=font_small)
+frequency_mode_1 = tk.Radiobutton(frequency, text="0-25kHz", font=font_small, variable=frequency_mode_var, value=1, command=lambda: [write_data('MD' + str(frequency_mode_var.get())), write_data('RE')])
+frequency_mode_2 = tk.Radiobutton(frequency, text="0-Span", font=font_small, variable=frequency_mode_var, value=2, command=lambda: [write_data('MD' + str(frequency_mode_var.get())), write_data('RE')])
+frequency_mode_3 = tk.Radiobutton(frequency, text="Adjust Start, Span", font=font_small, variable=frequency_mode_var, value=3, command=lambda: [write_data('MD' + str(frequency_mode_var.get())), write_data('RE')])
+frequency_mode_4 = tk.Radiobutton(frequency, text="Ajust Center, Span", font=font_small, variable=frequency_mode_var, value=4, command=lambda: [write_data('MD' + str(frequency_mode_var.get())), write_data('RE')])
+span_label = tk.Label(frequency, text="Freqency Span", font=font_small)
+span_menu = tk.OptionMenu(frequency, span_var, *span_list, command=lambda x: [write_data('SP' + str(span_list.index(span_var.get())+1)), write_data('RE')])
+adjust_slider = tk.Scale(frequency, label="Frequncy Adjust (Hz)", font=font_small, variable=adjust_var, from_=0, to=24999, orient=tk.HORIZONTAL, command=lambda x: [write_data('AD' + str(adjust_var.get()))])
+ref_level_slider = tk.Scale(frequency, label="Amplitude Reference Level", font=font_small, variable=ref_level_var, from_=1, to=9, orient=tk.HORIZONTAL, resolution=1, showvalue=0, repeatdelay=1000, command=lambda x: [write_data('AM' + str(ref_level_var.get())), refresh_figure_toolbar(), refresh_alphanumerics()])
+
+#Grid frequency and configure rows/columns
+frequency_mode_label.grid(row=0, column=1, columnspan=2, sticky='nwes')
+span_label.grid(row=0, column=0, sticky='nwes')
+span_menu.grid(row=1, column=0, sticky='nwes')
+frequency_mode_1.grid(row=1, column=1, sticky='nwes')
+frequency_mode_2.grid(row=2, column=1, sticky='nwes')
+frequency_mode_3.grid(row=1, column=2, sticky='nwes')
+frequency_mode_4.grid(row=2, column=2, sticky='nwes')
+adjust_slider.grid(row=3, column=0, columnspan=3, sticky='nwes')
+ref_level_slider.grid(row=4, column=0, columnspan=3, sticky='nwes')
+row_col_config(frequency, rows=[1,1,1,4,4], columns=[1,1,1])
+
+
+#Make frame to put coupling in, initiate vars
+coupling = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Make the needed widgets
+A_coupling_label = tk.Label(coupling, text="A Coupling", font=font_small)
+B_coupling_label = tk.Label(coupling, text="B Coupling", font=font_small)
+A_ac = tk.Radiobutton(coupling, text="AC", variable=A_coupling_var, value=1, font=font_small, command=lambda: [write_data('AC' + str(A_coupling_var.get()))])
+A_dc = tk.Radiobutton(coupling, text="DC", variable=A_coupling_var, value=2, font=font_small, command=lambda: [write_data('AC' + str(A_coupling_var.get()))])
+B_ac = tk.Radiobutton(coupling, text="AC", variable=B_coupling_var, value=1, font=font_small, command=lambda: [write_data('BC' + str(B_coupling_var.get()))])
+B_dc = tk.Radiobutton(coupling, text="DC", variable=B_coupling_var, value=2, font=font_small, command=lambda: [write_data('BC' + str(B_coupling_var.get()))])
+
+#Grid coupling, config rows/columns
+A_coupling_label.grid(row=0, column=0, sticky='nwes')
+B_coupling_label.grid(row=0, column=1, sticky='nwes')
+A_ac.grid(row=1, column=0, sticky='nwes')
+B_ac.grid(row=1, column=1, sticky='nwes')
+A_dc.grid(row=2, column=0, sticky='nwes')
+B_dc.grid(row=2, column=1, sticky='nwes')
+row_col_config(coupling, rows=[1,1,1], columns=[1,1])
+
+
+#Make frame to put average in, initiate vars
+average = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Make the needed widgets
+avg_type_label = tk.Label(average, text="Average Type", font=font_small)
+sample_num_label = tk.Label(average, text="Sample Number", font=font_small)
+avg_type_1 = tk.Radiobutton(average, text="Off", variable=avg_type_var, value=1, font=font_small, command=lambda: [write_data('AV' + str(avg_type_var.get()))])
+avg_type_2 = tk.Radiobutton(average, text="RMS", variable=avg_type_var, value=2, font=font_small, command=lambda: [write_data('AV' + str(avg_type_var.get()))])
+avg_type_3 = tk.Radiobutton(average, text="Time", variable=avg_type_var, value=3, font=font_small, command=lambda: [write_data('AV' + str(avg_type_var.get()))])
+avg_type_4 = tk.Radiobutton(average, text="Peak", variable=avg_type_var, value=4, font=font_small, command=lambda: [write_data('AV' + str(avg_type_var.get()))])
+sample_num_1 = tk.Radiobutton(average, text="4/64", variable=sample_num_var, value=1, font=font_small, command=lambda: [write_data('NU' + str(sample_num_var.get()))])
+sample_num_2 = tk.Radiobutton(average, text="8/128", variable=sample_num_var, value=2, font=font_small, command=lambda: [write_data('NU' + str(sample_num_var.get()))])
+sample_num_3 = tk.Radiobutton(average, text="16/256", variable=sample_num_var, value=3, font=font_small, command=lambda: [write_data('NU' + str(sample_num_var.get()))])
+sample_num_4 = tk.Radiobutton(average, text="32/Exp", variable=sample_num_var, value=4, font=font_small, command=lambda: [write_data('NU' + str(sample_num_var.get()))])
+restart_average = tk.Button(average, text="Restart", font=font_small, command=lambda: [write_data('RE')])
+number_shift = tk.Button(average, text="Shift", font=font_small, command=lambda: [toggle_button(number_shift, shift_var), write_data('SH' + str(shift_var.get()))])
+
+#Grid average, config rows/columns
+avg_type_label.grid(row=0, column=0, sticky='nwes')
+sample_num_label.grid(row=0, column=1, sticky='nwes')
+restart_average.grid(row=1, column=2, rowspan=2, sticky='nwes')
+avg_type_1.grid(row=1, column=0, sticky='nwes')
+avg_type_2.grid(row=2, column=0, sticky='nwes')
+avg_type_3.grid(row=3, column=0, sticky='nwes')
+avg_type_4.grid(row=4, column=0, sticky='nwes')
+sample_num_1.grid(row=1, column=1, sticky='nwes')
+sample_num_2.grid(row=2, column=1, sticky='nwes')
+sample_num_3.grid(row=3, column=1, sticky='nwes')
+sample_num_4.grid(row=4, column=1, sticky='nwes')
+number_shift.grid(row=3, column=2, rowspan=2, sticky='nwes')
+row_col_config(average, rows=[1,1,1,1,1], columns=[2,2,1])
+
+
+#Make frame to put export into
+export = tk.Frame(content, highlightbackground="grey", highlightthickness=2)
+
+#Make needed widgets
+export_label = tk.Label(export, text="Export Data", font=font_small)
+file_name_label = tk.Label(export, text="File Name:", font=font_small)
+file_name = tk.Entry(export, textvariable=file_name_var, font=font_small)
+export_csv = tk.Checkbutton(export, text="CSV", variable=export_csv_var, font=font_small)
+save_button = tk.Button(export, text="Save", font=font_small, command=lambda :[export_data()])
+clear_button = tk.Button(export, text='Clear', font=font_small, command=lambda :[file_name_var.set('')])
+
+#Grid export, config rows/columns
+export_label.grid(row=0, column=0, columnspan=2, sticky='nwes')
+file_name_label.grid(row=1, column=0, sticky='nwes')
+export_csv.grid(row=1, column=1, sticky='nwes')
+file_name.grid(row=2, column=0, columnspan=2, sticky='nwes')
+save_button.grid(row=3, column=0, sticky='nwes')
+clear_button.grid(row=3, column=1, sticky='nwes')
+row_col_config(export, rows=[1,1,1,2], columns=[1,1])
+
+
+#Make misc widgets that arent in a frame
+refresh_display = tk.Button(content, textvariable=refresh_display_var, font=font_small, command=refresh_or_retry)
+preset = tk.Button(content, text="Preset", font=font_small, command=lambda: [write_data('PRSIM2'), preset_values()])
+alphanumerics = tk.Label(content, textvariable=alphanumerics_var, font=font_big, highlightbackground="grey", highlightthickness=2)
+free_run = tk.Button(content, relief=tk.SUNKEN, text="Free Run", font=font_small, command=lambda: [toggle_button(free_run, free_run_var), write_data('FR' + str(free_run_var.get()))])
+repetative = tk.Button(content, relief=tk.SUNKEN, text="Repetative", font=font_small, command=lambda: [toggle_button(repetative, repetative_var), write_data('RP' + str(repetative_var.get()))])
+arm = tk.Button(content, text="Arm", font=font_small, command=lambda: [write_data('AR')])
+marker_table = tk.Label(content, textvariable=marker_table_var, font=("Courier", 10), justify=tk.LEFT, anchor='w')
+
+#Connects in the background, the display widgets are filled in when the SA answers
+connect()
+
+#Grid everything into content, configure
+display.grid(row=0, column=0, rowspan=14, columnspan=15, sticky='nwes')
+refresh_display.grid(row=14, column=0, rowspan=2, columnspan=2, sticky='nwes')
+preset.grid(row=16, column=0, rowspan=2, columnspan=2, sticky='nwes')
+trace.grid(row=14, column=2, rowspan=4, columnspan=8, sticky='nwes')
+passband.grid(row=14, column=10, rowspan=4, columnspan=5, sticky='nwes')
+alphanumerics.grid(row=0, column=15, rowspan=2, columnspan=17, sticky='nwes')
+sensitivity.grid(row=2, column=15, rowspan=2, columnspan=17, sticky='nwes')
+input_mode.grid(row=4, column=15, rowspan=4, columnspan=12, sticky='nwes')
+scale.grid(row=4, column=27, rowspan=4, columnspan=5, sticky='nwes')
+frequency.grid(row=8, column=15, rowspan=5, columnspan=11, sticky='nwes')
+free_run.grid(row=8, column=26, rowspan=2, columnspan=2, sticky='nwes')
+repetative.grid(row=8, column=28, rowspan=2, columnspan=2, sticky='nwes')
+arm.grid(row=8, column=30, rowspan=2, columnspan=2, sticky='nwes')
+coupling.grid(row=10, column=26, rowspan=3, columnspan=6, sticky='nwes')
+average.grid(row=13, column=15, rowspan=5, columnspan=12, sticky='nwes')
+export.grid(row=13, column=27, rowspan=5, columnspan=5, sticky='nwes')
+marker_table.grid(row=18, column=0, columnspan=32, sticky='nwes')
+row_col_config(content, rows=[1]*14, columns=[1]*15)
+
+#Grid content into root, configure
+content.grid(row=0, column=0, sticky='nwes')
+row_col_config(root, rows=[1], columns=[1])
+
+#Sends any waiting commands, stops the worker, and closes the session when the window is closed
+root.protocol('WM_DELETE_WINDOW', close_panel)
+
+root.after(20, poll_worker) #Starts delivering results from the worker
+
+#Benchmark.py loads the panel without starting the main loop so it can drive it
+if __name__ == '__main__':
+    root.mainloop() #Initiates the main loop for Tkinter
\ No newline at end of file